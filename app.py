@@ -7,19 +7,39 @@
 # Open: http://127.0.0.1:8000
 # --------------------------------------------------------------------------
 
+import io
 import os
 import re
+import csv
+import sys
+import time
+import gzip
+import html
+import asyncio
 import base64
 import uvicorn
 import httpx
 import json
+import bisect
+import heapq
+import hashlib
+import ipaddress
+import functools
+import threading
+import traceback
+import unicodedata
+import concurrent.futures
+from array import array
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from contextvars import Context, ContextVar
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
 from fastapi import (
     FastAPI, File, UploadFile, HTTPException, Query, Form, Depends, Request, Response
 )
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional
@@ -33,9 +53,37 @@ from vertexai.generative_models import GenerativeModel, ChatSession, Part
 
 # Auth
 import pymongo 
+from pymongo import monitoring
 from passlib.context import CryptContext 
 from jose import JWTError, jwt 
 
+try:
+    import brotli # Optional: enables "br" content-coding for pages and API responses
+except ImportError:
+    brotli = None
+
+try:
+    import orjson # Optional: faster JSON encoding for API responses
+except ImportError:
+    orjson = None
+
+try:
+    from PIL import Image, ImageOps # Optional: downscale/re-encode uploads before Vision/Gemini
+except ImportError:
+    Image = ImageOps = None
+
+try:
+    import numpy as np # Optional: local colour pre-filter for crop uploads (with Pillow)
+except ImportError:
+    np = None
+
+if Image is not None:
+    try:
+        import pillow_heif # Optional: lets Pillow decode HEIC/HEIF phone photos
+        pillow_heif.register_heif_opener()
+    except ImportError:
+        pass
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -56,15 +104,114 @@ SECRET_KEY = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 1 day
 
+# --------------------------------------------------------------------------
+# METRICS (in-process, Prometheus text format at /metrics)
+# --------------------------------------------------------------------------
+METRIC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRIC_HELP = {
+    "http_requests_total": ("counter", "HTTP requests by route, method and status."),
+    "http_request_duration_seconds": ("histogram", "HTTP request latency by route."),
+    "http_requests_in_flight": ("gauge", "HTTP requests currently being served."),
+    "upstream_request_duration_seconds": ("histogram", "Upstream call latency by dependency."),
+    "upstream_requests_in_flight": ("gauge", "Upstream calls currently in progress by dependency."),
+    "upstream_errors_total": ("counter", "Failed upstream calls by dependency and kind."),
+    "upstream_hedges_total": ("counter", "Hedged (duplicate) upstream requests sent by dependency."),
+    "cache_requests_total": ("counter", "Cache lookups by cache and result (hit/miss)."),
+    "event_loop_lag_seconds": ("histogram", "Delay between when the event loop should wake and when it did."),
+    "event_loop_lag_last_seconds": ("gauge", "Most recent event loop lag sample."),
+    "event_loop_stalls_total": ("counter", "Event loop stalls over LOOP_STALL_THRESHOLD_S by route."),
+    "geocode_lookups_total": ("counter", "Place lookups by source (gazetteer/remote/gazetteer_approximate/miss)."),
+    "crop_prefilter_total": ("counter", "Local crop image pre-filter verdicts (accept/reject/ambiguous)."),
+    "crop_jobs_total": ("counter", "Crop analysis jobs by status transition (queued/deduplicated/done/failed)."),
+}
+
+_metrics_lock = threading.Lock()
+_metric_values: dict = {} # (name, labels) -> float, for counters and gauges
+_metric_histograms: dict = {} # (name, labels) -> [bucket counts..., sum, count]
+
+def inc_metric(name: str, value: float = 1.0, **labels):
+    """Increments a counter, or moves a gauge when value is negative."""
+    key = (name, tuple(sorted(labels.items())))
+    with _metrics_lock:
+        _metric_values[key] = _metric_values.get(key, 0.0) + value
+
+def set_metric(name: str, value: float, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _metrics_lock:
+        _metric_values[key] = value
+
+def observe_metric(name: str, seconds: float, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    index = bisect.bisect_left(METRIC_BUCKETS, seconds)
+    with _metrics_lock:
+        hist = _metric_histograms.get(key)
+        if hist is None:
+            hist = _metric_histograms[key] = [0] * (len(METRIC_BUCKETS) + 2)
+        if index < len(METRIC_BUCKETS):
+            hist[index] += 1
+        hist[-2] += seconds
+        hist[-1] += 1
+
+def record_cache_lookup(cache: str, hit: bool):
+    inc_metric("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+def _format_labels(labels: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def render_metrics() -> str:
+    with _metrics_lock:
+        values = list(_metric_values.items())
+        histograms = [(key, list(hist)) for key, hist in _metric_histograms.items()]
+    lines = []
+    for name, (kind, help_text) in METRIC_HELP.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (metric, labels), value in values:
+            if metric == name:
+                lines.append(f"{name}{_format_labels(labels)} {value:.15g}")
+        for (metric, labels), hist in histograms:
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(METRIC_BUCKETS, hist):
+                cumulative += count
+                le = f'le="{bound:g}"'
+                lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+            le_inf = 'le="+Inf"'
+            lines.append(f"{name}_bucket{_format_labels(labels, le_inf)} {hist[-1]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {hist[-2]:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {hist[-1]}")
+    return "\n".join(lines) + "\n"
+
+class MongoMetricsListener(monitoring.CommandListener):
+    """Feeds every MongoDB command's latency into the upstream histograms."""
+    def started(self, event):
+        inc_metric("upstream_requests_in_flight", dependency="mongo")
+
+    def succeeded(self, event):
+        inc_metric("upstream_requests_in_flight", -1, dependency="mongo")
+        observe_metric("upstream_request_duration_seconds", event.duration_micros / 1e6, dependency="mongo")
+
+    def failed(self, event):
+        inc_metric("upstream_requests_in_flight", -1, dependency="mongo")
+        observe_metric("upstream_request_duration_seconds", event.duration_micros / 1e6, dependency="mongo")
+        inc_metric("upstream_errors_total", dependency="mongo", kind="error")
+
 # DB SETUP (MongoDB)
 MONGO_CONNECTION_STRING = os.getenv("MONGO_URL", "mongodb://localhost:27017/")
-db_client = pymongo.MongoClient(MONGO_CONNECTION_STRING)
+db_client = pymongo.MongoClient(MONGO_CONNECTION_STRING, event_listeners=[MongoMetricsListener()])
 db = db_client["grama_vaani_db"]
 users_collection = db["users"]
 chats_collection = db["chats"] 
+crop_jobs_collection = db["crop_jobs"]
 
 try:
     users_collection.create_index("email", unique=True)
+    crop_jobs_collection.create_index([("user_email", 1), ("image_sha256", 1), ("language", 1)])
+    crop_jobs_collection.create_index("created_at", expireAfterSeconds=int(os.getenv("CROP_JOB_RETENTION_S", "604800")))
 except Exception as e:
     print(f"Could not create index (this is normal if already exists): {e}")
 
@@ -72,6 +219,134 @@ except Exception as e:
 GOVT_SCHEME_API_KEY = "579b464db66ec23bdd000001c70d5371a46f42956f9f9a9e7034defd"
 GOVT_SCHEME_API_URL = "https://api.data.gov.in/resource/6176ee09-3d56-4a3b-8115-2184157c1f41"
 
+# --- Latency budgets (seconds) ---
+# Each endpoint gets one deadline; every upstream call made while serving it
+# uses whatever is left of that budget as its timeout.
+ENDPOINT_BUDGETS = {
+    "chat": float(os.getenv("BUDGET_CHAT_S", "15")),
+    "advisory": float(os.getenv("BUDGET_ADVISORY_S", "12")),
+    "weather": float(os.getenv("BUDGET_WEATHER_S", "10")),
+    "analyse_crop": float(os.getenv("BUDGET_ANALYSE_CROP_S", "25")),
+    "analyse_crop_batch": float(os.getenv("BUDGET_ANALYSE_CROP_BATCH_S", "40")),
+    "price": float(os.getenv("BUDGET_PRICE_S", "12")),
+    "scheme": float(os.getenv("BUDGET_SCHEME_S", "12")),
+    "suggest_questions": float(os.getenv("BUDGET_SUGGEST_S", "8")),
+    "crop_job": float(os.getenv("BUDGET_CROP_JOB_S", "60")), # Background; no client connection held
+    "forecast": float(os.getenv("BUDGET_FORECAST_S", "8")), # Shared Open-Meteo fetch, not tied to one request
+}
+UPSTREAM_TIMEOUT_CAP = 10.0 # No single upstream call may take longer than this
+TTS_MIN_BUDGET = float(os.getenv("TTS_MIN_BUDGET_S", "1.5")) # Skip optional TTS below this
+
+# --- Request hedging (Gemini / TTS tail latency) ---
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "false").lower() == "true"
+HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", "0.05")) # Max hedges as a fraction of calls
+HEDGE_MIN_SAMPLES = 20 # Don't hedge until the dependency's p95 is meaningful
+HEDGE_LATENCY_WINDOW = 200 # Recent latencies kept per operation for the p95
+
+# --- Upstream concurrency ---
+UPSTREAM_EXECUTOR_THREADS = 32
+# Calls (including abandoned ones still running) each dependency may hold on
+# upstream_executor, so one slow service can't take every thread.
+UPSTREAM_MAX_IN_FLIGHT = {
+    "gemini": int(os.getenv("UPSTREAM_MAX_IN_FLIGHT_GEMINI", "16")),
+    "vision": int(os.getenv("UPSTREAM_MAX_IN_FLIGHT_VISION", "8")),
+    "tts": int(os.getenv("UPSTREAM_MAX_IN_FLIGHT_TTS", "8")),
+}
+
+# --- Shared HTTP client ---
+# Connection pool size per upstream host; each host gets its own keep-alive pool.
+HTTP_HOST_POOL_LIMITS = {
+    "https://geocode.maps.co": 10,
+    "https://api.open-meteo.com": 20,
+    "https://api.data.gov.in": 10,
+}
+HTTP_KEEPALIVE_EXPIRY = 60.0
+HTTP_PREWARM = os.getenv("HTTP_PREWARM", "true").lower() == "true" # Open connections at startup
+HTTP_PREWARM_TIMEOUT = 3.0
+
+# --- Record/replay of upstream results (deterministic latency regression runs) ---
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off").lower() # off | record | replay
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", "upstream_cassette.jsonl")
+CASSETTE_LATENCY_SCALE = float(os.getenv("CASSETTE_LATENCY_SCALE", "1.0")) # Replay at recorded latency x scale
+CASSETTE_STRICT = os.getenv("CASSETTE_STRICT", "false").lower() == "true" # Fail on unrecorded inputs in replay
+
+# --- Event-loop lag monitor ---
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL_S", "0.25")) # How often the loop is probed
+LOOP_STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD_S", "0.2")) # Lag that counts as a stall
+LOOP_STALL_STACK_DEPTH = 12 # Frames logged for a blocking call
+
+# --- On-demand sampling profiler (/admin/profile) ---
+PROFILE_MAX_SECONDS = 60
+PROFILE_DEFAULT_INTERVAL_MS = 10 # ~100 samples/s keeps overhead low on a loaded worker
+
+# --- Dashboard bootstrap / advisory cache ---
+ADVISORY_CACHE_TTL = float(os.getenv("ADVISORY_CACHE_TTL_S", str(6 * 3600)))
+ADVISORY_CACHE_MAX_ENTRIES = 10000
+ADVISORY_CACHE_MAX_BYTES = int(os.getenv("ADVISORY_CACHE_MAX_MB", "64")) * 1024 * 1024 # Entries carry base64 TTS audio (~50-150 KB each)
+BOOTSTRAP_CHAT_PAGE_SIZE = 20
+
+# --- Response compression ---
+COMPRESSION_MIN_SIZE = 1024 # Bytes; smaller bodies aren't worth the CPU
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5 # Dynamic responses: good ratio at gzip-like speed
+COMPRESSIBLE_MEDIA_TYPES = ("application/json", "text/", "application/javascript")
+
+# --- Low-bandwidth mode ---
+# Negotiated per request (Save-Data / X-Low-Bandwidth headers) or stored on the profile.
+LOW_BANDWIDTH_TTS_SAMPLE_RATE = int(os.getenv("LOW_BANDWIDTH_TTS_SAMPLE_RATE", "16000")) # Hz, for OGG_OPUS
+LOW_BANDWIDTH_FORECAST_DAYS = int(os.getenv("LOW_BANDWIDTH_FORECAST_DAYS", "3"))
+
+# --- Offline gazetteer ---
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "india_places.csv"))
+GAZETTEER_REMOTE_FALLBACK = os.getenv("GAZETTEER_REMOTE_FALLBACK", "true").lower() == "true" # Ask geocode.maps.co on a local miss
+GAZETTEER_MIN_PREFIX = 4 # Shortest name accepted as a (unique) prefix match
+GAZETTEER_FUZZY_MIN_LENGTH = 5 # Shortest phonetic key matched within one edit; shorter ones collide with other places
+GAZETTEER_FUZZY = os.getenv("GAZETTEER_FUZZY", "true").lower() == "true" # Phonetic/edit-distance matching after exact and prefix lookups
+PLACE_SUGGEST_LIMIT = int(os.getenv("PLACE_SUGGEST_LIMIT", 8)) # Default number of /places/suggest results
+PLACE_SUGGEST_MAX_LIMIT = 20
+PLACE_SUGGEST_CACHE_CONTROL = os.getenv("PLACE_SUGGEST_CACHE_CONTROL", "public, max-age=86400") # Answers only change with the gazetteer file
+
+# --- Forecast grid cache ---
+FORECAST_GRID_DEGREES = float(os.getenv("FORECAST_GRID_DEGREES", "0.1")) # ~11 km cells, close to the forecast models' own grid; 0 disables snapping
+FORECAST_CACHE_TTL = float(os.getenv("FORECAST_CACHE_TTL_S", "1800")) # current_weather moves; daily values barely change within this
+FORECAST_CACHE_MAX_ENTRIES = int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", "4096"))
+FORECAST_DAYS = 7 # One superset request serves both /weather (7 days) and the daily advisory (today)
+
+# --- Crop analysis jobs ---
+CROP_JOB_WORKERS = int(os.getenv("CROP_JOB_WORKERS", "4"))
+CROP_JOB_STALE_AFTER = float(os.getenv("CROP_JOB_STALE_AFTER_S", "300")) # Re-queue "running" jobs older than this on startup
+CROP_JOB_EVENTS_TIMEOUT = float(os.getenv("CROP_JOB_EVENTS_TIMEOUT_S", "120")) # Max life of one SSE stream
+CROP_JOB_EVENTS_POLL = float(os.getenv("CROP_JOB_EVENTS_POLL_S", "2")) # Mongo re-check for jobs run by other processes
+CROP_JOB_WEBHOOK_TIMEOUT = float(os.getenv("CROP_JOB_WEBHOOK_TIMEOUT_S", "5"))
+CROP_JOB_WEBHOOK_HOSTS = [h.strip() for h in os.getenv("CROP_JOB_WEBHOOK_HOSTS", "").split(",") if h.strip()] # Empty: webhooks disabled
+
+# --- Upload preprocessing ---
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1024")) # Longest side sent to Vision/Gemini (px)
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "80"))
+CROP_BATCH_MAX_IMAGES = int(os.getenv("CROP_BATCH_MAX_IMAGES", "8")) # Per /analyse-crop/batch request
+
+# --- Upload limits ---
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "15")) * 1024 * 1024) # Per image
+UPLOAD_CHUNK_SIZE = 64 * 1024 # Uploads are validated and hashed in chunks of this size
+MULTIPART_OVERHEAD_BYTES = 64 * 1024 # Form fields and part headers on top of the image bytes
+# Whole-body caps, enforced while the body streams in (before multipart parsing buffers it).
+UPLOAD_BODY_LIMITS = {
+    "/analyse-crop": MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    "/analyse-crop/jobs": MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    "/analyse-crop/batch": CROP_BATCH_MAX_IMAGES * MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+}
+
+# --- Near-duplicate crop image cache (needs Pillow for the perceptual hash) ---
+CROP_IMAGE_CACHE_TTL = float(os.getenv("CROP_IMAGE_CACHE_TTL_S", str(24 * 3600)))
+CROP_IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("CROP_IMAGE_CACHE_MAX_ENTRIES", "2048")) # Lookups scan all entries
+CROP_IMAGE_MAX_DISTANCE = int(os.getenv("CROP_IMAGE_MAX_DISTANCE", "6")) # Max differing bits of 64 to count as the same photo
+
+# --- Local crop pre-filter (needs Pillow + NumPy); decides when Cloud Vision is needed ---
+CROP_PREFILTER_ENABLED = os.getenv("CROP_PREFILTER_ENABLED", "true").lower() == "true"
+CROP_PREFILTER_ACCEPT_GREEN = float(os.getenv("CROP_PREFILTER_ACCEPT_GREEN", "0.25")) # Vegetation share to accept without Vision
+CROP_PREFILTER_REJECT_GREEN = float(os.getenv("CROP_PREFILTER_REJECT_GREEN", "0.02")) # Below this, blank/grey frames are rejected
+
 # --------------------------------------------------------------------------
 # AUTH & PYDANTIC MODELS
 # --------------------------------------------------------------------------
@@ -127,6 +402,8 @@ class UserUpdateProfile(BaseModel):
     phone: Optional[str] = None
     location: Optional[str] = None
     preferred_crop: Optional[str] = None
+    low_bandwidth: Optional[bool] = None
+    include_audio: Optional[bool] = None
 
 class Message(BaseModel):
     role: str
@@ -1224,6 +1501,15 @@ HTML_CONTENT = """
             font-size: 0.9375rem;
             transition: all 0.2s;
         }
+        .profile-form-check {
+            display: flex;
+            align-items: center;
+            gap: 0.5rem;
+            color: var(--text-secondary);
+            font-size: 0.875rem;
+            margin-bottom: 0.5rem;
+            cursor: pointer;
+        }
         .profile-form-input:focus {
             outline: none;
             border-color: var(--accent-primary);
@@ -1903,7 +2189,7 @@ HTML_CONTENT = """
         /* === END CSS FOR QUESTION BAR TOGGLE === */
     </style>
 </head>
-<body onload="loadDailyAdvisory()">
+<body>
     <div class="app-container">
         <div class="overlay" id="overlay"></div>
             
@@ -1974,7 +2260,7 @@ HTML_CONTENT = """
                         <option value="ml-IN">മലയാളം</option>
                     </select>
                     <div class="profile-icon" id="profileIcon">
-                        <span>{{USER_INITIAL}}</span>
+                        <span data-user-field="initial">{{USER_INITIAL}}</span>
                     </div>
                 </div>
             </header>
@@ -2063,10 +2349,10 @@ HTML_CONTENT = """
                 <div class="messages-wrapper">
                     <div class="messages-container">
                         <div class="upload-area" id="uploadArea">
-                            <input type="file" id="cropImageUpload" accept="image/*" class="hidden">
+                            <input type="file" id="cropImageUpload" accept="image/*" class="hidden" multiple>
                             <i class="bi bi-cloud-upload upload-icon"></i>
                             <div class="upload-text">Upload Crop Image</div>
-                            <div class="upload-subtext">Click or drag to analyze for pests and diseases</div>
+                            <div class="upload-subtext">Click or drag to analyze for pests and diseases (select several photos of one field for a combined diagnosis)</div>
                         </div>
                         <div id="cropResult"></div>
                     </div>
@@ -2077,7 +2363,8 @@ HTML_CONTENT = """
                     <div class="messages-container">
                         <div style="max-width: 600px; margin: 2rem auto;">
                             <div class="input-wrapper">
-                                <input type="text" class="message-input" id="cityInput" placeholder="Enter city name...">
+                                <input type="text" class="message-input" id="cityInput" placeholder="Enter city name..." list="placeSuggestions" autocomplete="off">
+                                <datalist id="placeSuggestions"></datalist>
                                 <div class="input-actions">
                                     <button class="action-btn send-btn" id="getWeatherBtn">
                                         <i class="bi bi-search"></i>
@@ -2131,10 +2418,10 @@ HTML_CONTENT = """
         <button class="modal-close-btn" id="modalCloseBtn">&times;</button>
         <div class="modal-header">
             <div class="modal-avatar">
-                <span>{{USER_INITIAL}}</span>
+                <span data-user-field="initial">{{USER_INITIAL}}</span>
             </div>
             <div class="modal-username">Hi, {{USER_NAME}}!</div>
-            <div class="modal-email">{{USER_EMAIL}}</div>
+            <div class="modal-email" id="modalEmail">{{USER_EMAIL}}</div>
         </div>
         <form id="profileForm">
             <div class="profile-status" id="profileStatus"></div>
@@ -2148,12 +2435,16 @@ HTML_CONTENT = """
             </div>
             <div class="profile-form-group">
                 <label class="profile-form-label" for="profileLocation">Location (Village/City/State)</label>
-                <input type="text" id="profileLocation" class="profile-form-input" value="{{USER_LOCATION}}" placeholder="e.g., Coimbatore, Tamil Nadu">
+                <input type="text" id="profileLocation" class="profile-form-input" value="{{USER_LOCATION}}" placeholder="e.g., Coimbatore, Tamil Nadu" list="placeSuggestions" autocomplete="off">
             </div>
             <div class="profile-form-group">
                 <label class="profile-form-label" for="profileCrop">Preferred Crop</label>
                 <input type="text" id="profileCrop" class="profile-form-input" value="{{USER_CROP}}" placeholder="e.g., Paddy, Sugarcane, Tomato">
             </div>
+            <div class="profile-form-group">
+                <label class="profile-form-check"><input type="checkbox" id="profileLowBandwidth"> Low-bandwidth mode (short answers)</label>
+                <label class="profile-form-check"><input type="checkbox" id="profileIncludeAudio"> Include voice replies in low-bandwidth mode</label>
+            </div>
             
             <button type="submit" id="saveProfileBtn">Save Profile</button>
         </form>
@@ -2235,6 +2526,8 @@ HTML_CONTENT = """
         const profilePhoneInput = document.getElementById('profilePhone');
         const profileLocationInput = document.getElementById('profileLocation');
         const profileCropInput = document.getElementById('profileCrop');
+        const profileLowBandwidthInput = document.getElementById('profileLowBandwidth');
+        const profileIncludeAudioInput = document.getElementById('profileIncludeAudio');
         const profileStatusDiv = document.getElementById('profileStatus');
 
         // Other View Elements
@@ -2275,12 +2568,15 @@ HTML_CONTENT = """
         const allMessagesWrappers = document.querySelectorAll('.messages-wrapper');
 
         // Initialize
-        document.addEventListener('DOMContentLoaded', () => {
+        document.addEventListener('DOMContentLoaded', async () => {
             initSpeechRecognition();
             attachEventListeners();
-            loadChatHistory(); 
+            const bootstrap = await loadBootstrap();
             document.querySelector('.nav-item[data-view="chat"]').classList.add('active'); 
             switchView('chat', 'AI Assistant'); 
+            if (bootstrap && currentMessages.length === 0) {
+                renderSuggestedQuestions(bootstrap.suggested_questions || []);
+            }
         });
 
         // Secure Fetch Wrapper
@@ -2294,6 +2590,45 @@ HTML_CONTENT = """
             return response;
         }
         
+        // One round trip for profile, chat history, cached advisory and starter questions.
+        let bootstrapAdvisory = null;
+
+        async function loadBootstrap() {
+            const response = await secureFetch('/bootstrap');
+            if (!response || !response.ok) {
+                await loadProfile();
+                loadChatHistory();
+                return null;
+            }
+            const data = await response.json();
+            applyProfile(data.profile);
+            renderChatHistory(data.chats);
+            bootstrapAdvisory = data.advisory;
+            return data;
+        }
+
+        // The page shell is static and cached; user fields come from /me.
+        async function loadProfile() {
+            const response = await secureFetch('/me');
+            if (!response || !response.ok) return;
+            applyProfile(await response.json());
+        }
+
+        function applyProfile(user) {
+            const name = user.name || 'Farmer';
+            document.querySelectorAll('[data-user-field="initial"]').forEach(el => {
+                el.textContent = name.charAt(0).toUpperCase();
+            });
+            document.querySelector('.modal-username').textContent = `Hi, ${name}!`;
+            document.getElementById('modalEmail').textContent = user.email || '';
+            profileNameInput.value = user.name || '';
+            profilePhoneInput.value = user.phone || '';
+            profileLocationInput.value = user.location || '';
+            profileCropInput.value = user.preferred_crop || '';
+            profileLowBandwidthInput.checked = !!user.low_bandwidth;
+            profileIncludeAudioInput.checked = !!user.include_audio;
+        }
+
         // *** NEW: Load Daily Advisory ***
         async function loadDailyAdvisory() {
             if (currentView !== 'chat') return; 
@@ -2311,14 +2646,18 @@ HTML_CONTENT = """
             `;
             
             try {
-                const response = await secureFetch('/advisory');
-                if (!response) {
-                    dailyAdvisoryContainer.innerHTML = ''; 
-                    return; 
+                let data = bootstrapAdvisory;
+                bootstrapAdvisory = null;
+                if (!data) {
+                    const response = await secureFetch('/advisory');
+                    if (!response) {
+                        dailyAdvisoryContainer.innerHTML = ''; 
+                        return; 
+                    }
+                    
+                    data = await response.json();
                 }
                 
-                const data = await response.json();
-                
                 if (data.text) {
                     const htmlContent = window.marked.parse(data.text);
                     
@@ -2492,6 +2831,8 @@ HTML_CONTENT = """
             cityInput.addEventListener('keypress', (e) => {
                 if (e.key === 'Enter') handleGetWeather();
             });
+            attachPlaceSuggestions(cityInput);
+            attachPlaceSuggestions(profileLocationInput);
             
             getPriceBtn.addEventListener('click', handleGetPrice);
             priceInput.addEventListener('keypress', (e) => {
@@ -2543,6 +2884,8 @@ HTML_CONTENT = """
                 phone: profilePhoneInput.value.trim(),
                 location: profileLocationInput.value.trim(),
                 preferred_crop: profileCropInput.value.trim(),
+                low_bandwidth: profileLowBandwidthInput.checked,
+                include_audio: profileIncludeAudioInput.checked,
             };
             
             try {
@@ -2726,7 +3069,10 @@ HTML_CONTENT = """
             const response = await secureFetch('/chats');
             if (!response) return;
             
-            const chats = await response.json();
+            renderChatHistory(await response.json());
+        }
+
+        function renderChatHistory(chats) {
             chatHistoryList.innerHTML = ''; 
             
             chats.forEach(chat => {
@@ -3054,7 +3400,9 @@ HTML_CONTENT = """
 
         function playAudio(base64Audio) {
             handleStopAudio(); 
-            currentAudioDataUrl = `data:audio/mp3;base64,${base64Audio}`;
+            // Low-bandwidth replies are Ogg/Opus ("OggS" magic), everything else is MP3.
+            const mimeType = base64Audio.startsWith('T2dnUw') ? 'audio/ogg' : 'audio/mp3';
+            currentAudioDataUrl = `data:${mimeType};base64,${base64Audio}`;
             currentAudio = new Audio(currentAudioDataUrl);
             
             currentAudio.onplay = () => {
@@ -3100,7 +3448,7 @@ HTML_CONTENT = """
             if (currentAudioDataUrl) {
                 const a = document.createElement('a');
                 a.href = currentAudioDataUrl;
-                a.download = 'grama-vaani-response.mp3';
+                a.download = currentAudioDataUrl.startsWith('data:audio/ogg') ? 'grama-vaani-response.ogg' : 'grama-vaani-response.mp3';
                 document.body.appendChild(a);
                 a.click();
                 document.body.removeChild(a);
@@ -3110,7 +3458,9 @@ HTML_CONTENT = """
         }
 
         async function handleCropUpload(event) {
-            const file = event.target.files[0];
+            const files = Array.from(event.target.files);
+            if (files.length > 1) return handleCropBatchUpload(files);
+            const file = files[0];
             if (!file) return;
 
             addLoadingMessageToView(cropResult, "Analyzing image...");
@@ -3128,28 +3478,129 @@ HTML_CONTENT = """
             formData.append('language', languageSelect.value);
 
             try {
-                const response = await secureFetch('/analyse-crop', {
+                const response = await secureFetch('/analyse-crop/jobs', {
                     method: 'POST',
                     body: formData
                 });
                 if (!response) return; 
                 
-                const data = await response.json(); 
+                const job = await response.json();
+                const data = response.ok ? await waitForCropJob(job) : null;
                 
-                if (response.status !== 200) {
-                    addAIMessageToView(cropResult, data.detail.text || "Sorry, image analysis failed.");
-                    if (data.detail.audio) playAudio(data.detail.audio);
+                if (!data || data.status !== 'done') {
+                    const reason = data ? data.error : (typeof job.detail === 'string' ? job.detail : null);
+                    addAIMessageToView(cropResult, reason || "Sorry, image analysis failed.");
                     return;
                 }
 
-                addAIMessageToView(cropResult, data.text);
-                playAudio(data.audio);
+                addAIMessageToView(cropResult, data.result.text);
+                if (data.result.audio) playAudio(data.result.audio);
             } catch (err) {
                 console.error('Crop Error:', err);
                 addAIMessageToView(cropResult, "Sorry, image analysis failed due to a network or server error.");
             }
         }
 
+        async function handleCropBatchUpload(files) {
+            addLoadingMessageToView(cropResult, `Analyzing ${files.length} images...`);
+            hideAudioControls();
+
+            const formData = new FormData();
+            files.forEach(file => formData.append('files', file));
+            formData.append('language', languageSelect.value);
+
+            try {
+                const response = await secureFetch('/analyse-crop/batch', {
+                    method: 'POST',
+                    body: formData
+                });
+                if (!response) return;
+
+                const data = await response.json();
+                if (!response.ok) {
+                    addAIMessageToView(cropResult, (data.detail && data.detail.text) || "Sorry, image analysis failed.");
+                    return;
+                }
+
+                const findings = data.images.map(item => `- **${item.filename || 'Photo ' + (item.index + 1)}:** ${item.finding}`).join('\\n');
+                addAIMessageToView(cropResult, `${findings}\\n\\n${data.summary}`);
+                if (data.audio) playAudio(data.audio);
+            } catch (err) {
+                console.error('Crop Batch Error:', err);
+                addAIMessageToView(cropResult, "Sorry, image analysis failed due to a network or server error.");
+            }
+        }
+
+        // Crop analysis runs as a server-side job: follow it over SSE and fall back
+        // to polling if the stream drops (the job keeps running either way).
+        function waitForCropJob(job) {
+            if (job.status === 'done' || job.status === 'failed') return Promise.resolve(job);
+            return new Promise((resolve) => {
+                const source = new EventSource(`/analyse-crop/jobs/${job.job_id}/events`);
+                source.addEventListener('status', (e) => {
+                    const update = JSON.parse(e.data);
+                    if (update.status === 'done' || update.status === 'failed') {
+                        source.close();
+                        resolve(update);
+                    }
+                });
+                source.onerror = () => {
+                    source.close();
+                    pollCropJob(job.job_id).then(resolve);
+                };
+            });
+        }
+
+        async function pollCropJob(jobId) {
+            while (true) {
+                await new Promise(r => setTimeout(r, 3000));
+                try {
+                    const response = await secureFetch(`/analyse-crop/jobs/${jobId}`);
+                    if (!response) return null;
+                    if (response.status === 404) return null;
+                    if (response.ok) {
+                        const job = await response.json();
+                        if (job.status === 'done' || job.status === 'failed') return job;
+                    }
+                } catch (err) {
+                    console.warn('Crop job poll failed, retrying:', err);
+                }
+            }
+        }
+
+        // Location autocomplete from the server-side gazetteer, so only known places reach /weather.
+        const placeSuggestions = document.getElementById('placeSuggestions');
+        let placeSuggestTimer = null;
+        let placeSuggestController = null;
+
+        function attachPlaceSuggestions(input) {
+            input.addEventListener('input', () => {
+                clearTimeout(placeSuggestTimer);
+                placeSuggestTimer = setTimeout(() => loadPlaceSuggestions(input.value.trim()), 150);
+            });
+        }
+
+        async function loadPlaceSuggestions(query) {
+            if (placeSuggestController) placeSuggestController.abort();
+            if (!query) {
+                placeSuggestions.innerHTML = '';
+                return;
+            }
+            placeSuggestController = new AbortController();
+            try {
+                const response = await fetch(`/places/suggest?q=${encodeURIComponent(query)}`, { signal: placeSuggestController.signal });
+                if (!response.ok) return;
+                const data = await response.json();
+                placeSuggestions.replaceChildren(...data.suggestions.map((place) => {
+                    const option = document.createElement('option');
+                    option.value = place.label;
+                    return option;
+                }));
+            } catch (err) {
+                if (err.name !== 'AbortError') console.warn('Place suggestions failed:', err);
+            }
+        }
+
         async function handleGetWeather() {
             const city = cityInput.value.trim();
             if (!city) {
@@ -3232,10 +3683,238 @@ HTML_CONTENT = """
 </html>
 """
 
+# --------------------------------------------------------------------------
+# PAGE TEMPLATES (compiled once at import)
+# --------------------------------------------------------------------------
+
+_TEMPLATE_SLOT_RE = re.compile(r"\{\{(\w+)\}\}")
+
+def compile_template(source: str) -> tuple:
+    """Splits a {{SLOT}} template into its static segments and slot names."""
+    parts = _TEMPLATE_SLOT_RE.split(source)
+    return parts[0::2], parts[1::2]
+
+def render_template(template: tuple, values: dict) -> str:
+    """Fills the slots with HTML-escaped values in a single join."""
+    statics, slots = template
+    out = [""] * (len(statics) + len(slots))
+    out[0::2] = statics
+    out[1::2] = [html.escape(str(values.get(slot, "")), quote=True) for slot in slots]
+    return "".join(out)
+
+def precompress(body: str) -> dict:
+    """Encodes a static page once per content-coding: {"identity": ..., "gzip": ..., "br": ...}."""
+    raw = body.encode("utf-8")
+    variants = {"identity": raw, "gzip": gzip.compress(raw, compresslevel=9)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(raw, quality=11)
+    return variants
+
+def accepted_encodings(accept_encoding: str) -> set:
+    encodings = set()
+    for item in accept_encoding.split(","):
+        token, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        encodings.add(token.strip().lower())
+    return encodings
+
+def negotiate_encoding(variants: dict, request: Request) -> str:
+    """The best precompressed variant the client accepts ("br", "gzip" or "identity")."""
+    accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+    for encoding in ("br", "gzip"):
+        if encoding in variants and encoding in accepted:
+            return encoding
+    return "identity"
+
+def precompressed_response(variants: dict, request: Request, media_type: str = "text/html; charset=utf-8", headers: Optional[dict] = None, encoding: Optional[str] = None) -> Response:
+    """Serves the best precompressed variant the client accepts."""
+    encoding = encoding or negotiate_encoding(variants, request)
+    headers = {"Vary": "Accept-Encoding", **(headers or {})}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(variants[encoding], media_type=media_type, headers=headers)
+
+# --------------------------------------------------------------------------
+# STATIC SHELLS AND VERSIONED ASSETS
+# --------------------------------------------------------------------------
+# The inline <style> and <script> of each page are served as content-hashed
+# files under /assets/ with immutable caching. The dashboard HTML is a static
+# shell without user data (filled in by the page from /me), so browsers can
+# revalidate it with an ETag and get a 304 on repeat visits.
+
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+SHELL_CACHE_CONTROL = "private, no-cache"
+ASSET_MEDIA_TYPES = {"css": "text/css; charset=utf-8", "js": "application/javascript; charset=utf-8"}
+
+def split_static_assets(page: str, name: str) -> tuple:
+    """Moves a page's inline <style> and <script> blocks into versioned asset files."""
+    assets = {}
+    def extract(pattern: str, ext: str, tag: str):
+        nonlocal page
+        match = re.search(pattern, page, re.S)
+        body = match.group(1)
+        filename = f"{name}.{hashlib.sha256(body.encode('utf-8')).hexdigest()[:12]}.{ext}"
+        assets[filename] = precompress(body)
+        page = page[:match.start()] + tag.format(url=f"/assets/{filename}") + page[match.end():]
+    extract(r"<style>(.*?)</style>", "css", '<link rel="stylesheet" href="{url}">')
+    extract(r"<script>(.*?)</script>", "js", '<script src="{url}"></script>')
+    return page, assets
+
+# Each content-coding is a different representation, so it gets its own strong
+# validator; otherwise a cache could pair gzip bytes with the br ETag.
+ETAG_ENCODING_SUFFIXES = {"identity": "", "gzip": "-gz", "br": "-br"}
+
+def shell_etag(variants: dict) -> str:
+    """Content hash shared by a page's variants; shell_response adds the per-encoding suffix."""
+    return hashlib.sha256(variants["identity"]).hexdigest()[:16]
+
+_login_shell, _login_assets = split_static_assets(LOGIN_HTML_CONTENT, "login")
+_dashboard_shell, _dashboard_assets = split_static_assets(HTML_CONTENT, "dashboard")
+STATIC_ASSETS = {**_login_assets, **_dashboard_assets}
+
+DASHBOARD_TEMPLATE = compile_template(_dashboard_shell)
+# No user data in the shell: every slot renders empty until /me answers.
+DASHBOARD_SHELL_VARIANTS = precompress(render_template(DASHBOARD_TEMPLATE, {}))
+DASHBOARD_SHELL_ETAG = shell_etag(DASHBOARD_SHELL_VARIANTS)
+LOGIN_PAGE_VARIANTS = precompress(_login_shell)
+LOGIN_PAGE_ETAG = shell_etag(LOGIN_PAGE_VARIANTS)
+
+def shell_response(variants: dict, etag: str, request: Request) -> Response:
+    encoding = negotiate_encoding(variants, request)
+    etag = f'"{etag}{ETAG_ENCODING_SUFFIXES[encoding]}"'
+    headers = {"ETag": etag, "Cache-Control": SHELL_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    # If-None-Match uses weak comparison and may list several validators.
+    candidates = {tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")}
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=headers)
+    return precompressed_response(variants, request, headers=headers, encoding=encoding)
+
+# --------------------------------------------------------------------------
+# RESPONSE PIPELINE (fast JSON + negotiated compression)
+# --------------------------------------------------------------------------
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available, otherwise compact stdlib json."""
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class CompressionMiddleware:
+    """Compresses single-body responses with br or gzip, as negotiated by Accept-Encoding.
+
+    Streaming responses (e.g. server-sent events) and bodies that already carry
+    a Content-Encoding (precompressed pages) pass through untouched.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = b""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value
+        accepted = accepted_encodings(accept.decode("latin-1"))
+        encoding = "br" if brotli is not None and "br" in accepted else "gzip" if "gzip" in accepted else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough or start_message is None:
+                await send(message)
+                return
+            headers = start_message["headers"]
+            body = message.get("body", b"")
+            content_type = next((v.decode("latin-1") for k, v in headers if k.lower() == b"content-type"), "")
+            if (message.get("more_body", False) or len(body) < COMPRESSION_MIN_SIZE
+                    or any(k.lower() == b"content-encoding" for k, _ in headers)
+                    or not content_type.startswith(COMPRESSIBLE_MEDIA_TYPES)):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+            if encoding == "br":
+                body = brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+            else:
+                body = gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL)
+            vary = b", ".join(v for k, v in headers if k.lower() == b"vary")
+            if b"accept-encoding" not in vary.lower():
+                vary = vary + b", Accept-Encoding" if vary else b"Accept-Encoding"
+            headers = [(k, v) for k, v in headers if k.lower() not in (b"content-length", b"vary")]
+            headers += [(b"content-encoding", encoding.encode()), (b"content-length", str(len(body)).encode()), (b"vary", vary)]
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, compressing_send)
+
+class UploadLimitMiddleware:
+    """Rejects upload bodies over UPLOAD_BODY_LIMITS with 413, counting bytes as they arrive.
+
+    A too-large Content-Length is refused before any body is read; chunked or
+    lying clients are cut off as soon as the running total passes the limit.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = UPLOAD_BODY_LIMITS.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        too_large = FastJSONResponse(
+            status_code=413,
+            content={"detail": {"text": f"Upload too large. Please send images under {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.", "audio": None}},
+            headers={"Connection": "close"},
+        )
+        content_length = next((v for k, v in scope["headers"] if k == b"content-length"), None)
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await too_large(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            # Once the limit is hit, whatever the app answers is replaced by the 413.
+            if not exceeded:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded:
+            await too_large(scope, receive, send)
+
 # --------------------------------------------------------------------------
 # FASTAPI APP
 # --------------------------------------------------------------------------
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -3243,6 +3922,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Registered before the @app.middleware functions so it sits inside them and
+# sees the endpoint's single response body.
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(UploadLimitMiddleware)
 
 # Global clients/sessions
 tts_client = None
@@ -3250,25 +3933,520 @@ vision_client = None
 gemini_model = None
 chat_session = None
 
+# Google SDK calls are blocking and Gemini has no per-call timeout, so they run
+# on this pool and the caller waits at most the remaining request budget.
+upstream_executor = concurrent.futures.ThreadPoolExecutor(max_workers=UPSTREAM_EXECUTOR_THREADS, thread_name_prefix="upstream")
+
+# One keep-alive client for geocode.maps.co, Open-Meteo and data.gov.in, so
+# requests reuse DNS/TCP/TLS work instead of paying it on every call.
+http_client: Optional[httpx.AsyncClient] = None
+
+def create_http_client() -> httpx.AsyncClient:
+    try:
+        import h2  # noqa: F401 (httpx only speaks HTTP/2 when h2 is installed)
+        http2 = True
+    except ImportError:
+        http2 = False
+    mounts = {
+        host: httpx.AsyncHTTPTransport(
+            http2=http2,
+            limits=httpx.Limits(max_connections=size, max_keepalive_connections=size, keepalive_expiry=HTTP_KEEPALIVE_EXPIRY),
+        )
+        for host, size in HTTP_HOST_POOL_LIMITS.items()
+    }
+    return httpx.AsyncClient(http2=http2, timeout=UPSTREAM_TIMEOUT_CAP, mounts=mounts)
+
+async def prewarm_http_client():
+    """Opens a pooled connection to each upstream host so the first real request skips the handshake."""
+    async def warm(host: str):
+        try:
+            await http_client.head(host, timeout=HTTP_PREWARM_TIMEOUT)
+        except Exception as e:
+            print(f"Prewarm failed for {host}: {e}")
+    await asyncio.gather(*(warm(host) for host in HTTP_HOST_POOL_LIMITS))
+
+async def http_get(dependency: str, url: str, **kwargs) -> httpx.Response:
+    """GET through the shared client with the request's remaining budget as timeout, recording metrics."""
+    timeout = remaining_budget(dependency)
+    start = time.monotonic()
+    inc_metric("upstream_requests_in_flight", dependency=dependency)
+    try:
+        response = await http_client.get(url, timeout=timeout, **kwargs)
+        response.raise_for_status()
+        return response
+    except httpx.TimeoutException:
+        inc_metric("upstream_errors_total", dependency=dependency, kind="timeout")
+        raise
+    except Exception:
+        inc_metric("upstream_errors_total", dependency=dependency, kind="error")
+        raise
+    finally:
+        inc_metric("upstream_requests_in_flight", -1, dependency=dependency)
+        observe_metric("upstream_request_duration_seconds", time.monotonic() - start, dependency=dependency)
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    start = time.monotonic()
+    inc_metric("http_requests_in_flight")
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        inc_metric("http_requests_in_flight", -1)
+        # Label by route template (e.g. /chats/{chat_id}) to keep label cardinality bounded.
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        inc_metric("http_requests_total", route=path, method=request.method, status=str(status))
+        observe_metric("http_request_duration_seconds", time.monotonic() - start, route=path)
+
 @app.on_event("startup")
-def startup_event():
-    global tts_client, vision_client, gemini_model, chat_session
+async def startup_event():
+    global tts_client, vision_client, gemini_model, chat_session, http_client
     try:
+        http_client = create_http_client()
+        if HTTP_PREWARM:
+            await prewarm_http_client()
         tts_client = texttospeech.TextToSpeechClient()
         vision_client = vision.ImageAnnotatorClient()
         vertexai.init(project=GCP_PROJECT_ID, location=GCP_LOCATION)
         gemini_model = GenerativeModel("gemini-2.0-flash") 
         chat_session = gemini_model.start_chat()
+        if LOOP_MONITOR_ENABLED:
+            start_loop_monitor()
+        start_crop_job_workers()
         print("All clients initialized.")
     except Exception as e:
         print(f"STARTUP ERROR: {e}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    stop_loop_monitor()
+    await stop_crop_job_workers()
+    if http_client is not None:
+        await http_client.aclose()
+
+# --------------------------------------------------------------------------
+# REQUEST DEADLINES
+# --------------------------------------------------------------------------
+
+_request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+def start_request_deadline(endpoint: str) -> float:
+    """Starts the latency budget for the current request (see ENDPOINT_BUDGETS)."""
+    deadline = time.monotonic() + ENDPOINT_BUDGETS[endpoint]
+    _request_deadline.set(deadline)
+    return deadline
+
+def budget_left() -> Optional[float]:
+    """Seconds left before the request deadline, or None outside a budgeted request."""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+def remaining_budget(name: str, cap: float = UPSTREAM_TIMEOUT_CAP) -> float:
+    """Timeout for the next upstream call; raises TimeoutError once the budget is spent."""
+    left = budget_left()
+    if left is None:
+        return cap
+    if left <= 0:
+        raise TimeoutError(f"{name}: request deadline exceeded")
+    return min(cap, left)
+
+async def run_upstream(name: str, fn, *args, cap: float = UPSTREAM_TIMEOUT_CAP, hedge: bool = False, operation: Optional[str] = None, **kwargs):
+    """Runs a blocking upstream call on upstream_executor and awaits it, giving up when the request budget runs out.
+
+    With hedge=True (and HEDGING_ENABLED), an identical second request is sent
+    if the first has not returned by the p95 of `operation` (default: `name`);
+    the first response wins. Only use it for idempotent calls. To overlap
+    independent calls, wrap this in asyncio.ensure_future and cancel losers.
+    """
+    operation = operation or name
+    timeout = remaining_budget(name, cap)
+    started = time.monotonic()
+    deadline = started + timeout
+    slots = _upstream_slots(name)
+    acquire = asyncio.ensure_future(slots.acquire())
+    def give_up():
+        # A slot granted in the meantime goes straight back.
+        acquire.add_done_callback(lambda task: task.cancelled() or slots.release())
+        acquire.cancel()
+    try:
+        await asyncio.wait({acquire}, timeout=timeout)
+    except asyncio.CancelledError:
+        give_up()
+        raise
+    if not acquire.done():
+        give_up()
+        inc_metric("upstream_errors_total", dependency=name, kind="saturated")
+        raise TimeoutError(f"{name}: all {UPSTREAM_MAX_IN_FLIGHT.get(name, UPSTREAM_EXECUTOR_THREADS)} upstream slots busy for {timeout:.1f}s")
+
+    pending = {_submit_upstream(slots, name, operation, fn, args, kwargs)}
+    error = None
+    try:
+        hedge_after = _hedge_delay(operation) if hedge and HEDGING_ENABLED else None
+        if hedge_after is not None and hedge_after < timeout:
+            done, _ = await asyncio.wait(pending, timeout=max(0.0, started + hedge_after - time.monotonic()))
+            # A hedge only uses a free slot; it never waits for one.
+            if not done and not slots.locked() and _acquire_hedge(operation, name):
+                await slots.acquire()
+                pending.add(_submit_upstream(slots, name, operation, fn, args, kwargs))
+
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+    finally:
+        for future in pending:
+            # Running SDK calls can't be interrupted; the result is dropped and
+            # the slot is freed once the thread actually finishes.
+            future.cancel()
+    if error is not None:
+        raise error
+    inc_metric("upstream_errors_total", dependency=name, kind="timeout")
+    raise TimeoutError(f"{name}: no response within {timeout:.1f}s")
+
+_upstream_slot_semaphores: dict = {} # dependency name -> (event loop, asyncio.Semaphore)
+
+def _upstream_slots(name: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    entry = _upstream_slot_semaphores.get(name)
+    if entry is None or entry[0] is not loop:
+        limit = UPSTREAM_MAX_IN_FLIGHT.get(name, UPSTREAM_EXECUTOR_THREADS)
+        entry = _upstream_slot_semaphores[name] = (loop, asyncio.Semaphore(limit))
+    return entry[1]
+
+def _submit_upstream(slots: asyncio.Semaphore, name: str, operation: str, fn, args: tuple, kwargs: dict) -> asyncio.Future:
+    """Starts one attempt on upstream_executor; its slot is released when the thread finishes, not when the caller gives up."""
+    loop = asyncio.get_running_loop()
+    future = upstream_executor.submit(_timed_upstream_call, name, operation, fn, args, kwargs)
+    def release(_):
+        try:
+            loop.call_soon_threadsafe(slots.release)
+        except RuntimeError:
+            pass # Loop already closed (shutdown)
+    future.add_done_callback(release)
+    return asyncio.wrap_future(future)
+
+# --------------------------------------------------------------------------
+# REQUEST HEDGING
+# --------------------------------------------------------------------------
+
+# Keyed by operation (e.g. "translate", "crop_diagnosis"), not dependency: one
+# Gemini p95 would mix short translations with multi-image diagnoses.
+_upstream_latencies: dict = {} # operation -> deque of recent successful latencies
+_hedge_counters: dict = {} # operation -> [calls, hedges]
+_hedge_lock = threading.Lock()
+
+def _timed_upstream_call(name: str, operation: str, fn, args: tuple, kwargs: dict):
+    start = time.monotonic()
+    inc_metric("upstream_requests_in_flight", dependency=name)
+    try:
+        result = fn(*args, **kwargs)
+    except Exception:
+        inc_metric("upstream_errors_total", dependency=name, kind="error")
+        raise
+    finally:
+        inc_metric("upstream_requests_in_flight", -1, dependency=name)
+        observe_metric("upstream_request_duration_seconds", time.monotonic() - start, dependency=name)
+    window = _upstream_latencies.get(operation)
+    if window is None:
+        window = _upstream_latencies.setdefault(operation, deque(maxlen=HEDGE_LATENCY_WINDOW))
+    window.append(time.monotonic() - start)
+    return result
+
+def _hedge_delay(operation: str) -> Optional[float]:
+    """Observed p95 latency of an operation, or None while there are too few samples."""
+    with _hedge_lock:
+        _hedge_counters.setdefault(operation, [0, 0])[0] += 1
+    samples = sorted(_upstream_latencies.get(operation, ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return samples[int(len(samples) * 0.95) - 1]
+
+def _acquire_hedge(operation: str, name: str) -> bool:
+    """Takes one hedge from the operation's budget so hedging adds at most HEDGE_BUDGET_RATIO extra QPS."""
+    with _hedge_lock:
+        calls, hedges = _hedge_counters.setdefault(operation, [0, 0])
+        if hedges + 1 > calls * HEDGE_BUDGET_RATIO:
+            return False
+        _hedge_counters[operation][1] += 1
+    inc_metric("upstream_hedges_total", dependency=name)
+    return True
+
+# --------------------------------------------------------------------------
+# SERVER-TIMING (per-stage latency breakdown)
+# --------------------------------------------------------------------------
+
+# Per-request {"spans": [(stage, seconds), ...], "debug": bool}; None outside a request.
+_request_timings: ContextVar[Optional[dict]] = ContextVar("request_timings", default=None)
+
+@contextmanager
+def timing_span(stage: str):
+    """Times one stage of the current request for the Server-Timing header (no-op outside a request)."""
+    timings = _request_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings["spans"].append((stage, time.perf_counter() - start))
+
+def stage_durations_ms(timings: dict) -> dict:
+    """Sums repeated stages (e.g. two TTS calls) into milliseconds per stage."""
+    totals = {}
+    for stage, seconds in timings["spans"]:
+        totals[stage] = totals.get(stage, 0.0) + seconds * 1000
+    return {stage: round(ms, 2) for stage, ms in totals.items()}
+
+def timed_json_response(payload: dict) -> FastJSONResponse:
+    """JSONResponse that times its own serialization and, when requested, embeds the stage timings."""
+    timings = _request_timings.get()
+    if timings is not None and timings["debug"]:
+        payload = {**payload, "timing": stage_durations_ms(timings)}
+    with timing_span("serialize"):
+        return FastJSONResponse(content=payload)
+
+@app.middleware("http")
+async def server_timing_middleware(request: Request, call_next):
+    # Opt in to the JSON "timing" field with ?debug_timing=1 or an X-Debug-Timing: 1 header.
+    debug = request.query_params.get("debug_timing") == "1" or request.headers.get("x-debug-timing") == "1"
+    timings = {"spans": [], "debug": debug}
+    _request_timings.set(timings)
+    start = time.perf_counter()
+    response = await call_next(request)
+    entries = [f"{stage};dur={ms}" for stage, ms in stage_durations_ms(timings).items()]
+    entries.append(f"total;dur={round((time.perf_counter() - start) * 1000, 2)}")
+    response.headers["Server-Timing"] = ", ".join(entries)
+    return response
+
+# --------------------------------------------------------------------------
+# RECORD / REPLAY (CASSETTE_MODE)
+# --------------------------------------------------------------------------
+# In record mode each wrapped helper's result and wall time are appended to
+# CASSETTE_PATH as JSON lines. In replay mode the same helpers return the
+# recorded result after sleeping the recorded latency (x CASSETTE_LATENCY_SCALE),
+# so before/after comparisons run without network access or Google credentials.
+
+_cassette_lock = threading.Lock()
+_cassette_entries: dict = {} # key -> list of {"result", "elapsed"}
+_cassette_by_name: dict = {} # helper name -> list of entries, for non-strict fallback
+_cassette_cursor: dict = {} # key or name -> next index (round-robin over repeated recordings)
+
+def _cassette_key(name: str, args: tuple, kwargs: dict) -> str:
+    def encode(value):
+        if isinstance(value, bytes):
+            return "sha256:" + hashlib.sha256(value).hexdigest()
+        if isinstance(value, BaseModel):
+            return value.model_dump()
+        return str(value)
+    # Replies also depend on the low-bandwidth/audio profile, which isn't an argument.
+    raw = json.dumps([name, args, kwargs, response_profile_key()], sort_keys=True, default=encode, ensure_ascii=False)
+    return name + ":" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _load_cassette():
+    try:
+        with open(CASSETTE_PATH, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                _cassette_entries.setdefault(entry["key"], []).append(entry)
+                _cassette_by_name.setdefault(entry["name"], []).append(entry)
+        print(f"Cassette loaded: {sum(len(v) for v in _cassette_entries.values())} recordings from {CASSETTE_PATH}")
+    except FileNotFoundError:
+        print(f"Cassette not found: {CASSETTE_PATH}")
+
+def _record_to_cassette(name: str, key: str, result, elapsed: float):
+    line = json.dumps({"key": key, "name": name, "elapsed": round(elapsed, 6), "result": result}, ensure_ascii=False)
+    with _cassette_lock:
+        with open(CASSETTE_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+def _next_recording(name: str, key: str) -> dict:
+    entries = _cassette_entries.get(key)
+    cursor_key = key
+    if not entries:
+        if CASSETTE_STRICT or not _cassette_by_name.get(name):
+            raise LookupError(f"Cassette has no recording for {name} with these arguments")
+        entries, cursor_key = _cassette_by_name[name], name
+    with _cassette_lock:
+        index = _cassette_cursor.get(cursor_key, 0)
+        _cassette_cursor[cursor_key] = index + 1
+    return entries[index % len(entries)]
+
+def cassette(name: str):
+    """Records or replays a helper's result according to CASSETTE_MODE (a no-op when off)."""
+    def decorator(fn):
+        if CASSETTE_MODE not in ("record", "replay"):
+            return fn
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                key = _cassette_key(name, args, kwargs)
+                if CASSETTE_MODE == "replay":
+                    entry = _next_recording(name, key)
+                    await asyncio.sleep(entry["elapsed"] * CASSETTE_LATENCY_SCALE)
+                    return entry["result"]
+                start = time.perf_counter()
+                result = await fn(*args, **kwargs)
+                _record_to_cassette(name, key, result, time.perf_counter() - start)
+                return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = _cassette_key(name, args, kwargs)
+            if CASSETTE_MODE == "replay":
+                entry = _next_recording(name, key)
+                # Blocking on purpose: the live helpers block the caller too.
+                time.sleep(entry["elapsed"] * CASSETTE_LATENCY_SCALE)
+                return entry["result"]
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            _record_to_cassette(name, key, result, time.perf_counter() - start)
+            return result
+        return wrapper
+    return decorator
+
+if CASSETTE_MODE == "replay":
+    _load_cassette()
+
+# --------------------------------------------------------------------------
+# EVENT-LOOP MONITOR
+# --------------------------------------------------------------------------
+# A coroutine wakes every LOOP_LAG_INTERVAL and records how late it woke up
+# (the loop lag). A watchdog thread watches that heartbeat; when the loop has
+# not come back within LOOP_STALL_THRESHOLD it grabs the loop thread's stack,
+# which points straight at the blocking call (e.g. tts_client.synthesize_speech
+# or pwd_context.verify), and logs it with the route being served.
+
+_loop_monitor = {"task": None, "thread": None, "stop": None, "loop_thread_id": None, "heartbeat": 0.0}
+
+async def _loop_lag_probe():
+    while True:
+        expected = time.monotonic() + LOOP_LAG_INTERVAL
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        now = time.monotonic()
+        lag = max(0.0, now - expected)
+        _loop_monitor["heartbeat"] = now
+        observe_metric("event_loop_lag_seconds", lag)
+        set_metric("event_loop_lag_last_seconds", lag)
+
+def _route_for_stack(frames: list) -> str:
+    """Route of the request on the blocked stack, from the innermost ASGI `scope` local.
+
+    Middleware, dependencies and the endpoint all run with the scope somewhere
+    below them, so stalls in any of them are attributed to their request. The
+    route template is set once routing has matched; before that, the raw path.
+    """
+    route = "background"
+    for frame in frames:
+        scope = frame.f_locals.get("scope")
+        if isinstance(scope, dict) and scope.get("type") == "http":
+            matched = scope.get("route")
+            route = getattr(matched, "path", None) or scope.get("path") or route
+    return route
+
+def _loop_watchdog(stop: threading.Event):
+    reported_heartbeat = None
+    while not stop.wait(LOOP_STALL_THRESHOLD / 2):
+        heartbeat = _loop_monitor["heartbeat"]
+        stalled_for = time.monotonic() - heartbeat - LOOP_LAG_INTERVAL
+        if stalled_for < LOOP_STALL_THRESHOLD or heartbeat == reported_heartbeat:
+            continue
+        reported_heartbeat = heartbeat # Report each stall once
+        frame = sys._current_frames().get(_loop_monitor["loop_thread_id"])
+        if frame is None:
+            continue
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        route = _route_for_stack(reversed(frames))
+        inc_metric("event_loop_stalls_total", route=route)
+        stack = "".join(traceback.format_list(traceback.extract_stack(frames[0], limit=LOOP_STALL_STACK_DEPTH)))
+        print(f"Event loop blocked for >{stalled_for:.3f}s while serving {route}. Blocking stack:\n{stack}")
+
+def start_loop_monitor():
+    _loop_monitor["loop_thread_id"] = threading.get_ident()
+    _loop_monitor["heartbeat"] = time.monotonic()
+    _loop_monitor["task"] = asyncio.get_running_loop().create_task(_loop_lag_probe())
+    stop = threading.Event()
+    thread = threading.Thread(target=_loop_watchdog, args=(stop,), name="loop-watchdog", daemon=True)
+    thread.start()
+    _loop_monitor["stop"], _loop_monitor["thread"] = stop, thread
+
+def stop_loop_monitor():
+    if _loop_monitor["task"] is not None:
+        _loop_monitor["task"].cancel()
+        _loop_monitor["stop"].set()
+        _loop_monitor["task"] = None
+
+# --------------------------------------------------------------------------
+# SAMPLING PROFILER
+# --------------------------------------------------------------------------
+# Samples every thread's stack at a fixed interval from a helper thread and
+# aggregates them as collapsed stacks ("thread;outer;...;inner count"), the
+# input format of flamegraph.pl and speedscope. Only this worker is profiled.
+
+_profiler_lock = threading.Lock()
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def sample_stacks(seconds: float, interval: float) -> dict:
+    """Blocking: samples all threads for `seconds`, returning {collapsed stack: count}."""
+    counts = {}
+    own_id = threading.get_ident()
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            key = ";".join(reversed(stack))
+            counts[key] = counts.get(key, 0) + 1
+        time.sleep(interval)
+    return counts
+
+async def profile_worker(seconds: float, interval: float) -> str:
+    """Profiles this worker without blocking the event loop; one profile at a time."""
+    if not _profiler_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running on this worker")
+    try:
+        counts = await asyncio.to_thread(sample_stacks, seconds, interval)
+    finally:
+        _profiler_lock.release()
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
+
 # --------------------------------------------------------------------------
 # AUTH DEPENDENCY
 # --------------------------------------------------------------------------
 
 async def get_current_user_dependency(request: Request):
+    with timing_span("auth"):
+        return _load_current_user(request)
+
+def _load_current_user(request: Request) -> dict:
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
@@ -3291,6 +4469,426 @@ async def get_current_user_dependency(request: Request):
     
     return user_doc
 
+async def get_admin_user_dependency(current_user: dict = Depends(get_current_user_dependency)):
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+# --------------------------------------------------------------------------
+# LOW-BANDWIDTH PROFILE
+# --------------------------------------------------------------------------
+
+# Per-request response profile: {"low_bandwidth": bool, "audio": bool}.
+_response_profile: ContextVar[Optional[dict]] = ContextVar("response_profile", default=None)
+
+def _header_flag(value: Optional[str]) -> Optional[bool]:
+    if value is None:
+        return None
+    return value.strip().lower() in ("1", "on", "true", "yes")
+
+def resolve_response_profile(request: Request, current_user: dict) -> dict:
+    """Headers win over the stored profile; audio is opt-in on low bandwidth."""
+    low_bandwidth = _header_flag(request.headers.get("x-low-bandwidth"))
+    if low_bandwidth is None and _header_flag(request.headers.get("save-data")):
+        low_bandwidth = True
+    if low_bandwidth is None:
+        low_bandwidth = bool(current_user.get("low_bandwidth", False))
+
+    audio = _header_flag(request.headers.get("x-include-audio"))
+    if audio is None:
+        audio = bool(current_user.get("include_audio", False)) if low_bandwidth else True
+    return {"low_bandwidth": low_bandwidth, "audio": audio}
+
+async def response_profile_dependency(request: Request, current_user: dict = Depends(get_current_user_dependency)):
+    """Authenticates like get_current_user_dependency and applies the response profile."""
+    _response_profile.set(resolve_response_profile(request, current_user))
+    return current_user
+
+def is_low_bandwidth() -> bool:
+    profile = _response_profile.get()
+    return bool(profile and profile["low_bandwidth"])
+
+def audio_requested() -> bool:
+    profile = _response_profile.get()
+    return profile is None or profile["audio"]
+
+def response_profile_key() -> tuple:
+    return (is_low_bandwidth(), audio_requested())
+
+def response_style_instruction() -> str:
+    """Extra prompt text that overrides the formatting rules for low-bandwidth users."""
+    if not is_low_bandwidth():
+        return ""
+    return (
+        "\n    **Low-bandwidth mode (overrides the formatting rules above):** reply in at most 3 short "
+        "plain sentences or bullets. No tables, headings, links or emojis.\n"
+    )
+
+# --------------------------------------------------------------------------
+# CACHES
+# --------------------------------------------------------------------------
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after `ttl` seconds; lookups feed cache_requests_total.
+
+    With max_bytes, `weigh(value)` sizes each entry and the least recently used
+    entries are also evicted to keep the total under that many bytes.
+    """
+    def __init__(self, name: str, max_entries: int, ttl: float, max_bytes: Optional[int] = None, weigh=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.weigh = weigh or (lambda value: 0)
+        self.total_bytes = 0
+        self._entries = OrderedDict() # key -> (expires_at, value, size)
+        self._lock = threading.Lock()
+
+    def _drop(self, key):
+        self.total_bytes -= self._entries.pop(key)[2]
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._drop(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        record_cache_lookup(self.name, entry is not None)
+        return entry[1] if entry is not None else None
+
+    def put(self, key, value):
+        size = self.weigh(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self.total_bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+
+class ImageHashCache(TTLCache):
+    """TTLCache keyed by (namespace, 64-bit dHash) that also matches near-duplicate images."""
+    def __init__(self, name: str, max_entries: int, ttl: float, max_distance: int):
+        super().__init__(name, max_entries, ttl)
+        self.max_distance = max_distance
+
+    def find_similar(self, namespace, dhash: int):
+        """Closest entry in `namespace` within max_distance bits (Hamming), or None."""
+        now = time.monotonic()
+        best_key, best_distance = None, self.max_distance + 1
+        with self._lock:
+            for key, (expires_at, _, _) in self._entries.items():
+                if key[0] != namespace or expires_at <= now:
+                    continue
+                distance = bin(key[1] ^ dhash).count("1")
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+                    if distance == 0:
+                        break
+            value = None
+            if best_key is not None:
+                self._entries.move_to_end(best_key)
+                value = self._entries[best_key][1]
+        record_cache_lookup(self.name, best_key is not None)
+        return value
+
+def advisory_payload_size(payload: dict) -> int:
+    return len(payload.get("text") or "") + len(payload.get("audio") or "")
+
+# Daily advisories per user, profile and language (profile edits change the key).
+advisory_cache = TTLCache("advisory", ADVISORY_CACHE_MAX_ENTRIES, ADVISORY_CACHE_TTL, ADVISORY_CACHE_MAX_BYTES, advisory_payload_size)
+
+# Crop diagnoses (text + audio) by perceptual hash, per language and response profile.
+# Shared across users on purpose: a diagnosis depends only on the photo, and holds
+# nothing personal (analyze_crop_image's prompt carries no user details).
+crop_diagnosis_cache = ImageHashCache("crop_image", CROP_IMAGE_CACHE_MAX_ENTRIES, CROP_IMAGE_CACHE_TTL, CROP_IMAGE_MAX_DISTANCE)
+
+# Open-Meteo forecasts per grid cell (see snap_to_grid), shared by every place in the cell.
+forecast_cache = TTLCache("forecast", FORECAST_CACHE_MAX_ENTRIES, FORECAST_CACHE_TTL)
+
+# Raw upload sha256 -> dHash, so exact re-uploads hit crop_diagnosis_cache without being decoded.
+upload_hash_cache = TTLCache("upload_digest", CROP_IMAGE_CACHE_MAX_ENTRIES, CROP_IMAGE_CACHE_TTL)
+
+def crop_cache_namespace(language: str) -> tuple:
+    return (language, response_profile_key())
+
+def advisory_cache_key(current_user: dict, language: str) -> tuple:
+    return (
+        current_user.get("email"), current_user.get("name"), current_user.get("location", "India"),
+        current_user.get("preferred_crop", "Paddy"), language, datetime.utcnow().date().isoformat(),
+        response_profile_key(),
+    )
+
+# --------------------------------------------------------------------------
+# GAZETTEER (offline geocoding)
+# --------------------------------------------------------------------------
+# data/india_places.csv (name,kind,state,lat,lon,aliases) covers states/UTs and
+# district towns; "aliases" holds |-separated old names, short forms and
+# native-script spellings. Point GAZETTEER_PATH at a larger file with the same
+# columns (e.g. built from the GeoNames IN dump) for block- and village-level
+# coverage.
+
+# Devanagari, Bengali, Gurmukhi, Gujarati, Odia, Tamil, Telugu, Kannada and
+# Malayalam share the ISCII-derived Unicode layout: one 128-code-point block
+# each, with the same letter at the same offset. One table keyed by that offset
+# therefore transliterates all nine.
+INDIC_RANGE = range(0x0900, 0x0D80)
+INDIC_LATIN = {
+    0x01: "n", 0x02: "n", 0x03: "h",
+    0x05: "a", 0x06: "a", 0x07: "i", 0x08: "i", 0x09: "u", 0x0A: "u", 0x0B: "ri", 0x0C: "li",
+    0x0D: "e", 0x0E: "e", 0x0F: "e", 0x10: "ai", 0x11: "o", 0x12: "o", 0x13: "o", 0x14: "au",
+    0x15: "k", 0x16: "kh", 0x17: "g", 0x18: "gh", 0x19: "n",
+    0x1A: "ch", 0x1B: "chh", 0x1C: "j", 0x1D: "jh", 0x1E: "n",
+    0x1F: "t", 0x20: "th", 0x21: "d", 0x22: "dh", 0x23: "n",
+    0x24: "t", 0x25: "th", 0x26: "d", 0x27: "dh", 0x28: "n", 0x29: "n",
+    0x2A: "p", 0x2B: "ph", 0x2C: "b", 0x2D: "bh", 0x2E: "m",
+    0x2F: "y", 0x30: "r", 0x31: "r", 0x32: "l", 0x33: "l", 0x34: "zh", 0x35: "v",
+    0x36: "sh", 0x37: "sh", 0x38: "s", 0x39: "h",
+    0x3E: "a", 0x3F: "i", 0x40: "i", 0x41: "u", 0x42: "u", 0x43: "ri", 0x44: "ri",
+    0x45: "e", 0x46: "e", 0x47: "e", 0x48: "ai", 0x49: "o", 0x4A: "o", 0x4B: "o", 0x4C: "au", 0x4E: "r",
+    0x58: "k", 0x59: "kh", 0x5A: "g", 0x5B: "z", 0x5C: "r", 0x5D: "rh", 0x5E: "f", 0x5F: "y",
+    0x60: "ri", 0x61: "li", 0x62: "li", 0x63: "li",
+    **{0x66 + d: str(d) for d in range(10)},
+}
+INDIC_BLOCK_LATIN = {
+    0x0A00: {0x70: "n"}, # Gurmukhi tippi
+    0x0D00: {0x7A: "n", 0x7B: "n", 0x7C: "r", 0x7D: "l", 0x7E: "l", 0x7F: "k"}, # Malayalam chillu letters
+}
+INDIC_CONSONANTS = frozenset(range(0x15, 0x3A)) | frozenset(range(0x58, 0x60))
+INDIC_LETTERS = INDIC_CONSONANTS | frozenset(range(0x05, 0x15)) | {0x60, 0x61}
+INDIC_DEPENDENT = frozenset(range(0x3A, 0x4E)) | {0x55, 0x56, 0x57, 0x62, 0x63} # Vowel signs and virama
+INDIC_SCHWA_DELETING = {0x0900, 0x0980, 0x0A00, 0x0A80, 0x0B00} # Drop the word-final inherent "a" (राम -> ram)
+
+def transliterate_indic(text: str) -> str:
+    """Latin spelling of any Indic-script text in `text` (திருச்சி -> "tiruchchi"); other characters pass through.
+
+    A consonant carries the inherent "a" unless a vowel sign or virama follows it.
+    """
+    text = unicodedata.normalize("NFC", text)
+    out, letters = [], 0
+    for i, ch in enumerate(text):
+        cp = ord(ch)
+        if cp not in INDIC_RANGE:
+            out.append(ch)
+            letters = 0
+            continue
+        block, offset = cp & ~0x7F, cp & 0x7F
+        out.append(INDIC_BLOCK_LATIN.get(block, {}).get(offset) or INDIC_LATIN.get(offset, ""))
+        if offset in INDIC_LETTERS:
+            letters += 1
+        if offset not in INDIC_CONSONANTS:
+            continue
+        j = i + 1
+        if j < len(text) and ord(text[j]) == block | 0x3C: # Nukta
+            j += 1
+        following = ord(text[j]) if j < len(text) else 0
+        if following & ~0x7F == block and following & 0x7F in INDIC_DEPENDENT:
+            continue
+        if following not in INDIC_RANGE and block in INDIC_SCHWA_DELETING and letters > 1:
+            continue
+        out.append("a")
+    return "".join(out)
+
+def place_key(text: str) -> str:
+    """Lookup key: lowercase ASCII words separated by single spaces ("Tiruchirāppalli " -> "tiruchirappalli")."""
+    text = unicodedata.normalize("NFKD", transliterate_indic(text))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text).split())
+
+# Romanisations of the same name differ in aspiration, voicing (Tamil script does
+# not mark it), vowel length and doubling, so the phonetic key folds those away.
+SOUND_RULES = {
+    "zh": "l", "ch": "c", "kh": "k", "gh": "k", "jh": "c", "th": "t", "dh": "t", "ph": "p", "bh": "p",
+    "sh": "s", "rh": "r", "ee": "i", "oo": "u", "aa": "a", "ii": "i", "uu": "u",
+    "c": "k", "x": "ks", "q": "k", "z": "c", "f": "p", "w": "v", "g": "k", "j": "c", "d": "t", "b": "p",
+}
+SOUND_PATTERN = re.compile("|".join(sorted(SOUND_RULES, key=len, reverse=True)))
+
+def sound_key(key: str) -> str:
+    """Phonetic key of a place_key(): "tiruchchi", "tiruchi" and "thiruchi" all give "tiruci"."""
+    key = re.sub(r"y\b", "i", re.sub(r"c(?=[eiy])", "s", key)) # Word-final "y" is a vowel (Trichy); "c" before e/i/y is soft
+    key = SOUND_PATTERN.sub(lambda match: SOUND_RULES[match.group()], key.replace(" ", ""))
+    return re.sub(r"(.)\1+", r"\1", key)
+
+def sound_skeleton(sound: str) -> str:
+    """First letter plus the consonants of a sound_key(): vowels are the least reliable part of a spelling."""
+    return sound[:1] + re.sub("[aeiou]", "", sound[1:])
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or limit + 1 as soon as it is known to exceed `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+class Gazetteer:
+    """Place names in sorted parallel arrays, searched with bisect (exact and prefix matches).
+
+    Coordinates are array('f') columns rather than per-place objects, so a
+    village-level file stays compact. Every alias is an entry of its own that
+    carries the canonical name. Rows sharing a key keep file order, which is the
+    preference order (states first, then larger places).
+
+    Misspellings and ad-hoc transliterations fall through to `similar`: a
+    symmetric-delete index (SymSpell) over consonant skeletons of the phonetic
+    keys yields a handful of candidates, ranked by edit distance.
+    """
+    def __init__(self, rows: list):
+        entries = []
+        for order, row in enumerate(rows):
+            name_key = place_key(row["name"])
+            aliases = {place_key(alias) for alias in (row.get("aliases") or "").split("|")} - {"", name_key}
+            entries += [(name_key, order, False), *((key, order, True) for key in aliases)]
+        entries.sort()
+        ordered = [rows[order] for _, order, _ in entries]
+        self.keys = [key for key, _, _ in entries]
+        self.ranks = array("I", (order for _, order, _ in entries))
+        self.is_alias = bytes(is_alias for _, _, is_alias in entries)
+        self.names = [row["name"] for row in ordered]
+        self.kinds = [row["kind"] for row in ordered]
+        self.states = [row["state"] for row in ordered]
+        state_keys = {state: place_key(state) for state in set(self.states)}
+        self.state_keys = [state_keys[state] for state in self.states]
+        self.state_key_set = set(self.state_keys)
+        self.lats = array("f", (float(row["lat"]) for row in ordered))
+        self.lons = array("f", (float(row["lon"]) for row in ordered))
+        self.sounds = [sound_key(key) for key in self.keys]
+        self.skeletons = {}
+        for i, sound in enumerate(self.sounds):
+            for variant in self.deletions(sound_skeleton(sound)):
+                self.skeletons.setdefault(variant, []).append(i)
+
+    @staticmethod
+    def deletions(skeleton: str) -> set:
+        """The skeleton and every one-letter deletion of it; two skeletons within one edit share a member."""
+        variants = {skeleton}
+        if len(skeleton) > 2: # Deleting from one- and two-letter skeletons matches almost anything
+            variants.update(skeleton[:i] + skeleton[i + 1:] for i in range(len(skeleton)))
+        return variants
+
+    @classmethod
+    def load(cls, path: str) -> "Gazetteer":
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                gazetteer = cls(list(csv.DictReader(f)))
+        except FileNotFoundError:
+            print(f"Gazetteer file not found at {path}; geocoding will use the remote service only.")
+            return cls([])
+        print(f"Gazetteer loaded: {len(gazetteer)} places from {path}")
+        return gazetteer
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def exact(self, key: str) -> range:
+        return range(bisect.bisect_left(self.keys, key), bisect.bisect_right(self.keys, key))
+
+    def prefix(self, prefix: str) -> range:
+        # Keys are ASCII, so "\x7f" sorts after every key that starts with `prefix`.
+        return range(bisect.bisect_left(self.keys, prefix), bisect.bisect_left(self.keys, prefix + "\x7f"))
+
+    def similar(self, key: str) -> list:
+        """Entries whose phonetic key is within one edit of `key`'s, closest first.
+
+        One edit is all the budget: sound keys already fold voicing and
+        aspiration, so two edits reach unrelated places (Tenali, Theni).
+        """
+        sound = sound_key(key)
+        if len(sound) < GAZETTEER_FUZZY_MIN_LENGTH:
+            return []
+        limit = 1
+        candidates = set()
+        for variant in self.deletions(sound_skeleton(sound)):
+            candidates.update(self.skeletons.get(variant, ()))
+        best, matches = limit + 1, []
+        for i in sorted(candidates):
+            distance = edit_distance(sound, self.sounds[i], min(best, limit))
+            if distance < best:
+                best, matches = distance, [i]
+            elif distance == best and distance <= limit:
+                matches.append(i)
+        return matches
+
+    def place(self, i: int) -> tuple:
+        return round(self.lats[i], 4), round(self.lons[i], 4), self.names[i]
+
+    def lookup(self, query: str, approximate: bool = False) -> Optional[tuple]:
+        """(lat, lon, name) for "Place" or "Place, District/State" in any supported script; None when unknown.
+
+        Only exact names and aliases match unless `approximate`, which adds
+        unique prefixes and misspellings. A real village missing from the file
+        can look like the start of a district name (Bela, Belagavi) or a
+        misspelling of one (Hosur, Hisar), so callers try other sources first.
+        """
+        parts = [key for key in (place_key(part) for part in query.split(",")) if key]
+        if not parts:
+            return None
+        name, context = parts[0], set(parts[1:])
+        matches = self.exact(name)
+        if not matches:
+            if approximate and len(name) >= GAZETTEER_MIN_PREFIX:
+                matches = self.prefix(name)
+            if not matches and approximate and GAZETTEER_FUZZY and context & self.state_key_set:
+                # Misspellings only count inside a named state, where a near miss is
+                # far less likely to be some other real place.
+                matches = self.similar(name)
+            if context & self.state_key_set:
+                matches = [i for i in matches if self.state_keys[i] in context]
+            if len({self.names[i] for i in matches}) != 1:
+                return None # Ambiguous or unknown: let the caller decide
+        for i in matches:
+            if self.state_keys[i] in context:
+                return self.place(i)
+        if context & self.state_key_set:
+            return None # "Aurangabad, Bihar": the named state has no such place
+        return self.place(matches[0]) if matches else None
+
+    def suggest(self, query: str, limit: int) -> list:
+        """Ranked completions for a partly typed "Place[, State]", one per place.
+
+        Exact keys come first, then official names before aliases, then file
+        order. An unfinished state after the comma narrows by prefix
+        ("Salem, ta"). When nothing starts with the text, phonetic matches are
+        offered instead ("Coimbator").
+        """
+        name, _, state = query.partition(",")
+        name, state = place_key(name), place_key(state)
+        if not name:
+            return []
+        def in_state(i):
+            return self.state_keys[i].startswith(state)
+        found = heapq.nsmallest(
+            limit * 4, # Room for aliases of the same place
+            (i for i in self.prefix(name) if in_state(i)),
+            key=lambda i: (self.keys[i] != name, self.is_alias[i], self.ranks[i]),
+        )
+        if not found and len(name) >= GAZETTEER_MIN_PREFIX and GAZETTEER_FUZZY:
+            found += [i for i in self.similar(name) if in_state(i)]
+        suggestions, seen = [], set()
+        for i in found:
+            if self.ranks[i] in seen:
+                continue
+            seen.add(self.ranks[i])
+            label = self.names[i] if self.kinds[i] == "state" else f"{self.names[i]}, {self.states[i]}"
+            suggestions.append({"name": self.names[i], "state": self.states[i], "kind": self.kinds[i], "label": label})
+            if len(suggestions) == limit:
+                break
+        return suggestions
+
+gazetteer = Gazetteer.load(GAZETTEER_PATH)
+
 # --------------------------------------------------------------------------
 # CORE ASYNC FUNCTIONS (wrapped in simple sync helpers for the Python logic)
 # --------------------------------------------------------------------------
@@ -3300,7 +4898,7 @@ async def perform_signup(user_data: UserCreate, response: Response):
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await asyncio.to_thread(get_password_hash, user_data.password)
     user_in_db = UserInDB(
         name=user_data.name, email=user_data.email, phone=user_data.phone,
         hashed_password=hashed_password, location=user_data.location, 
@@ -3317,7 +4915,7 @@ async def perform_signup(user_data: UserCreate, response: Response):
 async def perform_login(form_data: UserLogin, response: Response):
     user = users_collection.find_one({"email": form_data.email})
     
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    if not user or not await asyncio.to_thread(verify_password, form_data.password, user["hashed_password"]):
         raise HTTPException(status_code=401, detail="Incorrect email or password", headers={"WWW-Authenticate": "Bearer"})
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -3340,6 +4938,16 @@ async def perform_update_profile(user_data: UserUpdateProfile, current_user: dic
     return {"message": "Profile updated successfully", "updated_fields": update_fields}
 
 async def handle_advisory(language: str, current_user: dict):
+    cache_key = advisory_cache_key(current_user, language)
+    payload = advisory_cache.get(cache_key)
+    if payload is None:
+        payload, cacheable = await generate_advisory(language, current_user)
+        if cacheable:
+            advisory_cache.put(cache_key, payload)
+    return timed_json_response(payload)
+
+async def generate_advisory(language: str, current_user: dict) -> tuple:
+    """Returns (advisory payload, whether it is complete enough to cache)."""
     location = current_user.get("location", "India")
     crop = current_user.get("preferred_crop", "Paddy")
     lang_code = language.split("-")[0]
@@ -3347,31 +4955,31 @@ async def handle_advisory(language: str, current_user: dict):
     if location in ["India", "Not Set"] or crop in ["Paddy", "Not Set"]:
         text = f"Hello, {current_user.get('name', 'Farmer')}! Your profile currently uses default settings (Location: **{location}**, Crop: **{crop}**). Please update your profile for truly localized advice! Today's general advice: Check your irrigation systems and plan your next week's fertilizer application."
         
-        text = translate_text(text, lang_code) if lang_code != "en" else text
+        text = await translate_text(text, lang_code) if lang_code != "en" else text
         
         clean_speech_text = clean_text_for_speech(text)
-        audio = text_to_speech_google(clean_speech_text, language)
-        return AdvisoryResponse(text=text, audio=audio)
+        audio = await text_to_speech_google(clean_speech_text, language)
+        return AdvisoryResponse(text=text, audio=audio).model_dump(), audio is not None or not audio_requested()
         
     try:
-        text = get_daily_advisory(location, crop, language)
+        text = await get_daily_advisory(location, crop, language)
         
         clean_speech_text = clean_text_for_speech(text)
-        audio = text_to_speech_google(clean_speech_text, language)
+        audio = await text_to_speech_google(clean_speech_text, language)
         
-        return AdvisoryResponse(text=text, audio=audio)
+        return AdvisoryResponse(text=text, audio=audio).model_dump(), audio is not None or not audio_requested()
     
     except Exception as e:
         print(f"Advisory endpoint error: {e}")
         err = "Sorry, failed to generate today's advisory due to a server error."
-        err = translate_text(err, lang_code) if lang_code != "en" else err
+        err = await translate_text(err, lang_code) if lang_code != "en" else err
         
         clean_speech_text = clean_text_for_speech(err)
-        audio = text_to_speech_google(clean_speech_text, language)
-        return AdvisoryResponse(text=err, audio=audio)
+        audio = await text_to_speech_google(clean_speech_text, language)
+        return AdvisoryResponse(text=err, audio=audio).model_dump(), False
 
 # --------------------------------------------------------------------------
-# API HELPER FUNCTIONS (Sync functions used by the async handlers)
+# API HELPER FUNCTIONS (used by the async handlers)
 # --------------------------------------------------------------------------
 
 def clean_text_for_speech(text: str) -> str:
@@ -3389,12 +4997,13 @@ def clean_text_for_speech(text: str) -> str:
         print(f"Error cleaning text: {e}")
         return text
 
-def translate_text(text: str, target_lang_code: str) -> str:
+async def translate_text(text: str, target_lang_code: str) -> str:
     if target_lang_code == "en" or not gemini_model:
         return text
     try:
         prompt = f"Translate the following text concisely into language code '{target_lang_code}'. Preserve all emojis and markdown formatting but translate the prose:\n\n{text}"
-        response = gemini_model.generate_content(prompt)
+        with timing_span("translate"):
+            response = await run_upstream("gemini", gemini_model.generate_content, prompt, hedge=True, operation="translate")
         clean_response = response.text.strip()
         if clean_response.startswith('"') and clean_response.endswith('"'):
             clean_response = clean_response[1:-1]
@@ -3422,30 +5031,108 @@ def get_weather_emoji_and_description(wmo_code: int):
             return emoji, desc
     return "🌡️", "Unknown"
 
-def get_weather(city: str, language: str = "en-US") -> str:
-    try:
-        with httpx.Client(timeout=10.0) as client:
-            r = client.get(f"https://geocode.maps.co/search?q={city}")
-            r.raise_for_status()
-            data = r.json()
-            if not data:
-                return f"Could not find location: {city}"
-            lat, lon = data[0]["lat"], data[0]["lon"]
-            city_name = data[0]["display_name"].split(",")[0]
-
-        params = {
-            "latitude": lat, "longitude": lon,
-            "current_weather": "true",
-            "daily": "weathercode,temperature_2m_max,temperature_2m_min,precipitation_sum",
-            "forecast_days": 7, "timezone": "auto"
-        }
-        with httpx.Client(timeout=10.0) as client:
-            r = client.get("https://api.open-meteo.com/v1/forecast", params=params)
-            r.raise_for_status()
+def compact_weather_report(city_name: str, current: dict, daily: dict) -> str:
+    """Plain-text forecast (no table or emojis) for low-bandwidth users."""
+    _, desc = get_weather_emoji_and_description(current["weathercode"])
+    lines = [f"{city_name}: now {current['temperature']}°C, {desc}."]
+    for i in range(min(LOW_BANDWIDTH_FORECAST_DAYS, len(daily["time"]))):
+        day_name = "Today" if i == 0 else "Tomorrow" if i == 1 else datetime.fromisoformat(daily["time"][i]).strftime("%a")
+        _, d = get_weather_emoji_and_description(daily["weathercode"][i])
+        lines.append(
+            f"{day_name}: {d}, {daily['temperature_2m_max'][i]}/{daily['temperature_2m_min'][i]}°C, "
+            f"rain {daily['precipitation_sum'][i]}mm."
+        )
+    return "\n".join(lines)
+
+async def geocode(query: str) -> Optional[tuple]:
+    """(lat, lon, place name) from the bundled gazetteer, falling back to geocode.maps.co.
+
+    Approximate gazetteer matches (prefixes, misspellings) are the last resort,
+    after the remote service.
+    """
+    place = gazetteer.lookup(query)
+    if place is not None:
+        inc_metric("geocode_lookups_total", source="gazetteer")
+        return place
+    remote_error = None
+    if GAZETTEER_REMOTE_FALLBACK:
+        try:
+            r = await http_get("geocode", "https://geocode.maps.co/search", params={"q": query})
             data = r.json()
+            if data:
+                inc_metric("geocode_lookups_total", source="remote")
+                return float(data[0]["lat"]), float(data[0]["lon"]), data[0]["display_name"].split(",")[0]
+        except Exception as e:
+            print(f"Remote geocoding error for '{query}': {e}")
+            remote_error = e
+    place = gazetteer.lookup(query, approximate=True)
+    if place is not None:
+        inc_metric("geocode_lookups_total", source="gazetteer_approximate")
+        return place
+    if remote_error is not None:
+        raise remote_error
+    inc_metric("geocode_lookups_total", source="miss")
+    return None
+
+def snap_to_grid(lat: float, lon: float) -> tuple:
+    """Nearest FORECAST_GRID_DEGREES grid node: the cache key and the coordinates sent to Open-Meteo."""
+    if FORECAST_GRID_DEGREES <= 0:
+        return round(lat, 4), round(lon, 4)
+    step = FORECAST_GRID_DEGREES
+    return round(round(lat / step) * step, 4), round(round(lon / step) * step, 4)
+
+_forecast_fetches = {} # Grid cell -> in-flight fetch, so concurrent misses for one cell make a single call
+
+async def fetch_forecast(cell: tuple) -> dict:
+    start_request_deadline("forecast")
+    params = {
+        "latitude": cell[0], "longitude": cell[1],
+        "current_weather": "true",
+        "daily": "weathercode,temperature_2m_max,temperature_2m_min,precipitation_sum",
+        "forecast_days": FORECAST_DAYS, "timezone": "auto"
+    }
+    r = await http_get("open-meteo", "https://api.open-meteo.com/v1/forecast", params=params)
+    data = r.json()
+    forecast_cache.put(cell, data)
+    return data
+
+async def get_forecast(lat: float, lon: float) -> dict:
+    """Open-Meteo current weather plus FORECAST_DAYS of daily values for the grid cell containing (lat, lon)."""
+    cell = snap_to_grid(lat, lon)
+    data = forecast_cache.get(cell)
+    if data is not None:
+        return data
+    fetch = _forecast_fetches.get(cell)
+    loop = asyncio.get_running_loop()
+    if fetch is None or fetch.get_loop() is not loop:
+        # A fresh context: the fetch serves every waiter, so it must not run under
+        # the first caller's deadline or record into its timing spans.
+        fetch = Context().run(loop.create_task, fetch_forecast(cell))
+        _forecast_fetches[cell] = fetch
+        fetch.add_done_callback(lambda done: _forecast_fetches.pop(cell, None) if _forecast_fetches.get(cell) is done else None)
+    # Shielded: one caller timing out must not cancel the fetch for the others.
+    return await asyncio.wait_for(asyncio.shield(fetch), remaining_budget("open-meteo"))
+
+@cassette("get_weather")
+async def get_weather(city: str, language: str = "en-US") -> str:
+    try:
+        with timing_span("geocode"):
+            place = await geocode(city)
+        if place is None:
+            return f"Could not find location: {city}"
+        lat, lon, city_name = place
+
+        with timing_span("forecast"):
+            data = await get_forecast(lat, lon)
 
         current = data["current_weather"]
         emoji, desc = get_weather_emoji_and_description(current["weathercode"])
+        daily = data["daily"]
+
+        if is_low_bandwidth():
+            report = compact_weather_report(city_name, current, daily)
+            lang_code = language.split("-")[0]
+            return await translate_text(report, lang_code) if lang_code != "en" else report
         
         report = f"## 7-Day Weather Forecast for {city_name}\n\n"
         report += f"**Current:** {emoji} {current['temperature']}°C | {desc} | Wind: {current['windspeed']} km/h\n\n"
@@ -3453,7 +5140,6 @@ def get_weather(city: str, language: str = "en-US") -> str:
         report += "| Day | Weather | High (°C) | Low (°C) | Rain (mm) |\n"
         report += "|:---:|:---:|:---:|:---:|:---:|\n"
         
-        daily = data["daily"]
         for i in range(7):
             date = daily["time"][i]
             day_name = "Today" if i == 0 else "Tomorrow" if i == 1 else datetime.fromisoformat(date).strftime("%A")
@@ -3465,50 +5151,41 @@ def get_weather(city: str, language: str = "en-US") -> str:
         report += "\n*Data from Open-Meteo.*"
 
         lang_code = language.split("-")[0]
-        return translate_text(report, lang_code) if lang_code != "en" else report
+        return await translate_text(report, lang_code) if lang_code != "en" else report
 
     except Exception as e:
         print(f"Weather error: {e}")
         return "Sorry, the external weather service could not be reached or the location was not specific enough."
 
-def get_daily_advisory(location: str, preferred_crop: str, language: str) -> str:
+async def get_daily_advisory(location: str, preferred_crop: str, language: str) -> str:
     if not gemini_model:
         return "AI not ready."
 
     lang_code = language.split("-")[0]
 
     try:
-        with httpx.Client(timeout=10.0) as client:
-            r = client.get(f"https://geocode.maps.co/search?q={location}")
-            r.raise_for_status()
-            data = r.json()
-            if not data:
-                weather_info = f"Weather: Location '{location}' not found."
-            else:
-                lat, lon = data[0]["lat"], data[0]["lon"]
-                
-                params = {
-                    "latitude": lat, "longitude": lon,
-                    "current_weather": "true",
-                    "daily": "weathercode,temperature_2m_max,precipitation_sum",
-                    "forecast_days": 1, "timezone": "auto"
-                }
-                r_weather = client.get("https://api.open-meteo.com/v1/forecast", params=params)
-                r_weather.raise_for_status()
-                weather_data = r_weather.json()
+        with timing_span("geocode"):
+            place = await geocode(location)
+        if place is None:
+            weather_info = f"Weather: Location '{location}' not found."
+        else:
+            lat, lon, place_name = place
+            
+            with timing_span("forecast"):
+                weather_data = await get_forecast(lat, lon)
 
-                current = weather_data["current_weather"]
-                daily = weather_data["daily"]
-                
-                emoji, desc = get_weather_emoji_and_description(current["weathercode"])
-                
-                weather_info = (
-                    f"Location: {data[0]['display_name'].split(',')[0]}, "
-                    f"Today: {emoji} {desc}, "
-                    f"Temp: {daily['temperature_2m_max'][0]}°C, "
-                    f"Rain: {daily['precipitation_sum'][0]}mm, "
-                    f"Wind: {current['windspeed']} km/h."
-                )
+            current = weather_data["current_weather"]
+            daily = weather_data["daily"]
+            
+            emoji, desc = get_weather_emoji_and_description(current["weathercode"])
+            
+            weather_info = (
+                f"Location: {place_name}, "
+                f"Today: {emoji} {desc}, "
+                f"Temp: {daily['temperature_2m_max'][0]}°C, "
+                f"Rain: {daily['precipitation_sum'][0]}mm, "
+                f"Wind: {current['windspeed']} km/h."
+            )
     except Exception as e:
         print(f"Advisory weather fetch failed: {e}")
         weather_info = f"Weather: Could not fetch forecast for {location}. Advisories will be general."
@@ -3530,23 +5207,25 @@ def get_daily_advisory(location: str, preferred_crop: str, language: str) -> str
     3.  End with a positive closing remark.
     4.  Use concise **Markdown (bolding and bullet points)** for clarity.
     5.  The entire response should be brief, a maximum of 4-5 sentences/points.
-    """
+    """ + response_style_instruction()
     
     try:
-        response = gemini_model.generate_content(prompt)
+        with timing_span("llm"):
+            response = await run_upstream("gemini", gemini_model.generate_content, prompt, hedge=True, operation="advisory")
         text = response.text.strip()
         
         if location in ["India", "Not Set"]:
-             text = translate_text(text, lang_code) if lang_code != "en" else text
+             text = await translate_text(text, lang_code) if lang_code != "en" else text
 
         return text
     except Exception as e:
         print(f"Gemini advisory error: {e}")
         generic_advice = f"Hello! Remember to check your {preferred_crop} fields for any early signs of pests or disease. A morning walk through your farm can prevent big problems! Have a productive day."
-        return translate_text(generic_advice, lang_code)
+        return await translate_text(generic_advice, lang_code)
 
 
-def get_gemini_response(question: str, language: str) -> str:
+@cassette("get_gemini_response")
+async def get_gemini_response(question: str, language: str) -> str:
     if not chat_session:
         return "Gemini not ready."
     lang_code = language.split("-")[0]
@@ -3556,58 +5235,163 @@ def get_gemini_response(question: str, language: str) -> str:
     Question: "{question}"
     Be concise and helpful. Use **Markdown** for formatting (like **bold** or bullet points).
     If user asks for weather, reply: WEATHER_REQUEST: [city]
-    """
+    """ + response_style_instruction()
     try:
-        response = chat_session.send_message(prompt)
+        with timing_span("llm"):
+            response = await run_upstream("gemini", chat_session.send_message, prompt, operation="chat")
         text = response.text.strip()
         if text.startswith("WEATHER_REQUEST:"):
             city = text.split(":", 1)[1].strip()
-            return get_weather(city, language)
+            return await get_weather(city, language)
         return text
     except Exception as e:
         print(f"Gemini error: {e}")
         return "Sorry, I encountered an error while processing your question."
 
-def analyze_crop_image(image_bytes: bytes, language: str) -> str:
+CROP_LABEL_WORDS = ["plant", "leaf", "crop", "soil", "vegetable", "fruit", "field"]
+NOT_A_CROP_IMAGE = "Not a clear crop image. Please upload a clear picture of the plant, leaf, or soil."
+
+class CropAnalysisError(RuntimeError):
+    """Vision/Gemini could not produce a diagnosis; the message is safe to show the farmer."""
+
+def is_crop_related(label_annotations) -> bool:
+    return any(word in l.description.lower() for l in label_annotations for word in CROP_LABEL_WORDS)
+
+@cassette("analyze_crop_image")
+async def analyze_crop_image(image_bytes: bytes, language: str, mime_type: str = "image/jpeg") -> str:
     if not vision_client or not gemini_model:
-        return "Vision/Gemini not ready."
+        raise CropAnalysisError("Vision/Gemini not ready.")
     try:
-        image = vision.Image(content=image_bytes)
-        labels = vision_client.label_detection(image=image)
-        names = [l.description.lower() for l in labels.label_annotations[:10]]
-        
-        is_crop_related = any(word in l.description.lower() for l in labels.label_annotations for word in ["plant", "leaf", "crop", "soil", "vegetable", "fruit", "field"])
-        
-        if not is_crop_related:
-            return "Not a clear crop image. Please upload a clear picture of the plant, leaf, or soil."
-            
         lang_code = language.split("-")[0]
         
         prompt = f"""
         You are a crop pathologist.
-        The image has been identified with these general labels: {', '.join(names)}.
         
-        **Your task:** Based on the image content (assume the image is passed directly to the multimodal model):
+        **Your task:** Based on the attached image:
         1.  Diagnose any visible pest, disease, or nutrient deficiency.
         2.  Provide a clear, brief remedy plan using **bullet points**.
         3.  Start with a salutation.
         
         Respond entirely in **{lang_code}**. Use Markdown for formatting.
-        """
+        """ + response_style_instruction()
         
-        image_part = Part.from_bytes(data=image_bytes, mime_type='image/jpeg') 
+        image_part = Part.from_data(data=image_bytes, mime_type=mime_type)
         
-        response = gemini_model.generate_content(
-            prompt, 
-            contents=[image_part]
-        )
+        looks_like_crop = await asyncio.to_thread(crop_prefilter, image_bytes)
+        if looks_like_crop is False:
+            return NOT_A_CROP_IMAGE
+        
+        # Gemini sees the image itself, so it starts alongside the Vision check
+        # instead of after it; a rejected image cancels it.
+        diagnosis = asyncio.ensure_future(run_upstream(
+            "gemini", gemini_model.generate_content, [image_part, prompt], hedge=True, operation="crop_diagnosis"
+        ))
+        # Abandoned when Vision rejects the image or fails; don't log its outcome as unretrieved.
+        diagnosis.add_done_callback(lambda task: task.cancelled() or task.exception())
+        try:
+            if not looks_like_crop:
+                image = vision.Image(content=image_bytes)
+                with timing_span("vision"):
+                    labels = await run_upstream("vision", vision_client.label_detection, image=image, timeout=remaining_budget("vision"))
+                if not is_crop_related(labels.label_annotations):
+                    return NOT_A_CROP_IMAGE
+            with timing_span("llm"):
+                response = await diagnosis
+        finally:
+            diagnosis.cancel()
         
         return response.text.strip()
     except Exception as e:
         print(f"Image analysis error: {e}")
-        return "Analysis failed due to an error in the AI service connection."
+        raise CropAnalysisError("Analysis failed due to an error in the AI service connection.") from e
+
+@cassette("analyze_crop_batch")
+async def analyze_crop_batch(images: list, language: str) -> dict:
+    """Field-level diagnosis of several (image bytes, mime type) photos with one Vision and one Gemini call."""
+    if not vision_client or not gemini_model:
+        raise CropAnalysisError("Vision/Gemini not ready.")
+    try:
+        verdicts = await asyncio.to_thread(lambda: [crop_prefilter(data) for data, _ in images])
+        unsure = [i for i, verdict in enumerate(verdicts) if verdict is None]
+        if unsure:
+            requests = [
+                vision.AnnotateImageRequest(
+                    image=vision.Image(content=images[i][0]),
+                    features=[vision.Feature(type_=vision.Feature.Type.LABEL_DETECTION, max_results=10)],
+                )
+                for i in unsure
+            ]
+            with timing_span("vision"):
+                batch = await run_upstream(
+                    "vision", vision_client.batch_annotate_images, requests=requests, timeout=remaining_budget("vision")
+                )
+            for i, response in zip(unsure, batch.responses):
+                verdicts[i] = is_crop_related(response.label_annotations)
+
+        crops = [i for i, verdict in enumerate(verdicts) if verdict]
+        findings = {i: NOT_A_CROP_IMAGE for i, verdict in enumerate(verdicts) if not verdict}
+        summary = "None of the photos clearly show a crop. Please upload clear pictures of the plants, leaves, or soil."
+        if crops:
+            lang_code = language.split("-")[0]
+            prompt = f"""
+            You are a crop pathologist. The {len(crops)} attached photos were taken in the same field, numbered 1 to {len(crops)} in order.
+            
+            **Your task:**
+            1.  For each photo, give a one-sentence finding (visible pest, disease, nutrient deficiency, or healthy).
+            2.  Give one consolidated field-level diagnosis with a brief remedy plan using **bullet points**, starting with a salutation.
+            
+            Respond entirely in **{lang_code}**. Use Markdown in the summary.
+            Reply with JSON only: {{"findings": ["<photo 1 finding>", "..."], "summary": "<field-level diagnosis>"}}
+            """ + response_style_instruction()
+            parts = [Part.from_data(data=images[i][0], mime_type=images[i][1]) for i in crops]
+            with timing_span("llm"):
+                response = await run_upstream(
+                    "gemini", gemini_model.generate_content, parts + [prompt],
+                    generation_config={"response_mime_type": "application/json"},
+                    hedge=True, operation="crop_batch"
+                )
+            try:
+                parsed = json.loads(response.text)
+                model_findings = [str(f).strip() for f in parsed.get("findings") or []]
+                summary = str(parsed.get("summary") or "").strip()
+            except (ValueError, AttributeError):
+                model_findings, summary = [], response.text.strip()
+            for n, i in enumerate(crops):
+                findings[i] = model_findings[n] if n < len(model_findings) else ""
+
+        return {
+            "images": [{"index": i, "crop": bool(verdicts[i]), "finding": findings[i]} for i in range(len(images))],
+            "summary": summary,
+        }
+    except Exception as e:
+        print(f"Batch image analysis error: {e}")
+        raise CropAnalysisError("Analysis failed due to an error in the AI service connection.") from e
+
+async def diagnose_crop_image(image_bytes: bytes, language: str, mime_type: str, dhash: Optional[int]) -> dict:
+    """Diagnosis text and audio, served from crop_diagnosis_cache for near-duplicate photos.
 
-def get_price_prediction(text: str, language: str) -> str:
+    Raises CropAnalysisError (nothing is cached) when the AI services fail.
+    """
+    namespace = crop_cache_namespace(language)
+    if dhash is not None:
+        cached = crop_diagnosis_cache.find_similar(namespace, dhash)
+        if cached is not None:
+            return cached
+    text = await analyze_crop_image(image_bytes, language, mime_type)
+    audio = await text_to_speech_google(clean_text_for_speech(text), language)
+    result = {"text": text, "audio": audio}
+    if dhash is not None and (audio is not None or not audio_requested()):
+        crop_diagnosis_cache.put((namespace, dhash), result)
+    return result
+
+def cached_crop_diagnosis(digest: str, language: str) -> Optional[dict]:
+    """Diagnosis for an upload seen before, looked up by its raw sha256 (no decoding needed)."""
+    dhash = upload_hash_cache.get(digest)
+    if dhash is None:
+        return None
+    return crop_diagnosis_cache.find_similar(crop_cache_namespace(language), dhash)
+
+async def get_price_prediction(text: str, language: str) -> str:
     if not gemini_model:
         return "AI not ready."
     
@@ -3629,9 +5413,9 @@ def get_price_prediction(text: str, language: str) -> str:
     1.  A brief introductory sentence.
     2.  A **Markdown Table** with the columns: "Crop Variety", "Average Price (₹)", "Max Price (₹)", and "Min Price (₹)".
     3.  A one-sentence concluding remark or disclaimer (e.g., "Prices are fictional and for demonstration only.").
-    """
+    """ + response_style_instruction()
     try:
-        response = gemini_model.generate_content(prompt)
+        response = await run_upstream("gemini", gemini_model.generate_content, prompt, hedge=True, operation="price")
         return response.text.strip()
     except Exception as e:
         print(f"Price prediction error: {e}")
@@ -3645,16 +5429,16 @@ def _get_fictional_price_data(query: str) -> str:
     else:
         return "No price data found for that crop. Please specify a crop like 'tomato' or 'onion'."
 
-def get_scheme_advice(text: str, language: str) -> str:
+async def get_scheme_advice(text: str, language: str) -> str:
     if not gemini_model:
         return "AI not ready."
 
-    scheme_list = _get_scheme_data_from_api(text)
+    scheme_list = await _get_scheme_data_from_api(text)
     lang_code = language.split("-")[0]
 
     if not scheme_list:
         no_scheme_msg = "No specific government schemes were found for your query. Please try being more descriptive (e.g., 'subsidy for drip irrigation')."
-        return translate_text(no_scheme_msg, lang_code) if lang_code != "en" else no_scheme_msg
+        return await translate_text(no_scheme_msg, lang_code) if lang_code != "en" else no_scheme_msg
 
     scheme_data_string = "\n".join([
         f"- Scheme: {s['title']}, Summary: {s['summary']}, Link: {s['link']}"
@@ -3674,16 +5458,17 @@ def get_scheme_advice(text: str, language: str) -> str:
     1.  An introductory sentence.
     2.  A **Markdown Table** with the columns: "Scheme Name", "Brief Summary", and "Link for Details".
     3.  A concluding remark encouraging the user to visit the links.
-    """
+    """ + response_style_instruction()
     
     try:
-        response = gemini_model.generate_content(prompt)
+        response = await run_upstream("gemini", gemini_model.generate_content, prompt, hedge=True, operation="scheme")
         return response.text.strip()
     except Exception as e:
         print(f"Scheme advice error: {e}")
         return "Sorry, the scheme advisor service failed."
 
-def _get_scheme_data_from_api(text: str) -> List[dict]:
+@cassette("_get_scheme_data_from_api")
+async def _get_scheme_data_from_api(text: str) -> List[dict]:
     params = {
         "api-key": GOVT_SCHEME_API_KEY,
         "format": "json",
@@ -3692,33 +5477,40 @@ def _get_scheme_data_from_api(text: str) -> List[dict]:
     }
     
     try:
-        with httpx.Client(timeout=10.0) as client:
-            response = client.get(GOVT_SCHEME_API_URL, params=params)
-            response.raise_for_status() 
-            data = response.json()
-
-            if "records" in data and data["records"]:
-                schemes = []
-                for scheme in data["records"]:
-                    summary = scheme.get("brief_description", "No Summary")
-                    if len(summary) > 70:
-                        summary = summary[:67] + "..."
-                        
-                    schemes.append({
-                        "title": scheme.get("scheme_name", "No Title"),
-                        "summary": summary,
-                        "link": scheme.get("more_details_url_link", "#")
-                    })
-                return schemes
-            else:
-                return []
+        response = await http_get("data.gov.in", GOVT_SCHEME_API_URL, params=params)
+        data = response.json()
+
+        if "records" in data and data["records"]:
+            schemes = []
+            for scheme in data["records"]:
+                summary = scheme.get("brief_description", "No Summary")
+                if len(summary) > 70:
+                    summary = summary[:67] + "..."
+                    
+                schemes.append({
+                    "title": scheme.get("scheme_name", "No Title"),
+                    "summary": summary,
+                    "link": scheme.get("more_details_url_link", "#")
+                })
+            return schemes
+        else:
+            return []
     except Exception as e:
         print(f"Scheme API error: {e}")
         return []
 
-def text_to_speech_google(text: str, language_code: str) -> str:
+@cassette("text_to_speech_google")
+async def text_to_speech_google(text: str, language_code: str) -> Optional[str]:
     if not tts_client:
         raise HTTPException(500, "TTS not ready.")
+    if not audio_requested():
+        return None
+    # Audio is optional: when the request budget is nearly spent, skip it and
+    # let the client show the text on its own.
+    left = budget_left()
+    if left is not None and left < TTS_MIN_BUDGET:
+        print(f"Skipping TTS: only {left:.2f}s of request budget left")
+        return None
     lang_map = {
         "en-US": ("en-US", "en-US-Standard-C"), 
         "hi-IN": ("hi-IN", "hi-IN-Wavenet-D"), 
@@ -3731,11 +5523,25 @@ def text_to_speech_google(text: str, language_code: str) -> str:
     
     input_text = texttospeech.SynthesisInput(text=text)
     voice_params = texttospeech.VoiceSelectionParams(language_code=gc_lang, name=voice)
-    audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
-    response = tts_client.synthesize_speech(input=input_text, voice=voice_params, audio_config=audio_config)
-    return base64.b64encode(response.audio_content).decode('utf-8')
+    if is_low_bandwidth():
+        # Opus at a narrowband-ish rate is a fraction of the default MP3 size.
+        audio_config = texttospeech.AudioConfig(
+            audio_encoding=texttospeech.AudioEncoding.OGG_OPUS,
+            sample_rate_hertz=LOW_BANDWIDTH_TTS_SAMPLE_RATE,
+        )
+    else:
+        audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
+    tts_timeout = remaining_budget("tts")
+    with timing_span("tts"):
+        response = await run_upstream(
+            "tts", tts_client.synthesize_speech,
+            input=input_text, voice=voice_params, audio_config=audio_config, timeout=tts_timeout,
+            hedge=True
+        )
+    with timing_span("b64"):
+        return base64.b64encode(response.audio_content).decode('utf-8')
 
-def get_suggested_questions(history: List[Message], language: str) -> List[str]:
+async def get_suggested_questions(history: List[Message], language: str) -> List[str]:
     if not gemini_model:
         return ["AI not ready for suggestions."]
 
@@ -3758,7 +5564,7 @@ def get_suggested_questions(history: List[Message], language: str) -> List[str]:
     """
     
     try:
-        response = gemini_model.generate_content(prompt)
+        response = await run_upstream("gemini", gemini_model.generate_content, prompt, hedge=True, operation="suggest_questions")
         text = response.text.strip().replace('*', '').replace('\n', '')
         questions = [q.strip() for q in text.split(',') if q.strip()]
         
@@ -3776,6 +5582,356 @@ def get_suggested_questions(history: List[Message], language: str) -> List[str]:
         print(f"Suggested questions generation error: {e}")
         return ["What is the current market price?", "How to prevent pest attacks?", "Where can I find government subsidies?"]
 
+STARTER_QUESTIONS = {
+    "en": ["What is the current market price?", "How to prevent pest attacks?", "Where can I find government subsidies?"],
+    "hi": ["वर्तमान बाज़ार भाव क्या है?", "कीटों के हमले से कैसे बचें?", "सरकारी सब्सिडी कहाँ मिल सकती है?"],
+    "ta": ["தற்போதைய சந்தை விலை என்ன?", "பூச்சித் தாக்குதலை எவ்வாறு தடுப்பது?", "அரசு மானியங்களை எங்கே பெறலாம்?"],
+    "te": ["ప్రస్తుత మార్కెట్ ధర ఎంత?", "పురుగుల దాడిని ఎలా నివారించాలి?", "ప్రభుత్వ సబ్సిడీలు ఎక్కడ పొందవచ్చు?"],
+    "kn": ["ಪ್ರಸ್ತುತ ಮಾರುಕಟ್ಟೆ ಬೆಲೆ ಎಷ್ಟು?", "ಕೀಟಗಳ ದಾಳಿಯನ್ನು ತಡೆಯುವುದು ಹೇಗೆ?", "ಸರ್ಕಾರಿ ಸಬ್ಸಿಡಿಗಳನ್ನು ಎಲ್ಲಿ ಪಡೆಯಬಹುದು?"],
+    "ml": ["ഇപ്പോഴത്തെ വിപണി വില എത്രയാണ്?", "കീടങ്ങളുടെ ആക്രമണം എങ്ങനെ തടയാം?", "സർക്കാർ സബ്സിഡികൾ എവിടെ ലഭിക്കും?"],
+}
+
+def get_starter_questions(language: str) -> List[str]:
+    return STARTER_QUESTIONS.get(language.split("-")[0], STARTER_QUESTIONS["en"])
+
+def get_user_profile(current_user: dict) -> dict:
+    return {
+        "name": current_user.get("name", "Farmer"),
+        "email": current_user.get("email", ""),
+        "phone": current_user.get("phone", ""),
+        "location": current_user.get("location", "Not Set"),
+        "preferred_crop": current_user.get("preferred_crop", "Paddy"),
+        "low_bandwidth": bool(current_user.get("low_bandwidth", False)),
+        "include_audio": bool(current_user.get("include_audio", False)),
+    }
+
+def list_chat_sessions(user_email: str, limit: int = 0) -> List[dict]:
+    chat_sessions = chats_collection.find(
+        {"user_email": user_email},
+        {"_id": 1, "title": 1, "created_at": 1}
+    ).sort("created_at", pymongo.DESCENDING)
+    if limit:
+        chat_sessions = chat_sessions.limit(limit)
+    return [{"id": str(chat["_id"]), "title": chat["title"]} for chat in chat_sessions]
+
+# --------------------------------------------------------------------------
+# IMAGE PREPROCESSING
+# --------------------------------------------------------------------------
+# Phone photos are 5-12 MB; the models only need ~1 megapixel. Uploads are
+# sniffed, EXIF-stripped, downscaled and re-encoded before any upstream call.
+
+class UnsupportedImageError(ValueError):
+    pass
+
+class UploadTooLargeError(ValueError):
+    pass
+
+async def inspect_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+    """Checks an upload chunk by chunk (type, magic bytes, size) and returns its sha256.
+
+    Nothing is held in memory beyond one chunk; the multipart parser has already
+    spooled the part (see UploadLimitMiddleware for the overall cap). The file is
+    rewound so it can be read once the duplicate caches have been checked.
+    """
+    if file.content_type and not file.content_type.startswith("image/") and file.content_type != "application/octet-stream":
+        raise UnsupportedImageError("Please upload an image file (JPEG, PNG, WebP or HEIC).")
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        if size == 0 and sniff_image_type(chunk) is None:
+            raise UnsupportedImageError("Unsupported image format. Please upload a JPEG, PNG, WebP or HEIC photo.")
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLargeError(f"Upload too large. Please send images under {max_bytes // (1024 * 1024)} MB.")
+        digest.update(chunk)
+    if size == 0:
+        raise UnsupportedImageError("The uploaded file is empty.")
+    await file.seek(0)
+    return digest.hexdigest()
+
+def sniff_image_type(data: bytes) -> Optional[str]:
+    """MIME type from the file's magic bytes (the client's Content-Type is not trusted)."""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[4:8] == b"ftyp" and data[8:12] in (b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1"):
+        return "image/heic"
+    return None
+
+def image_dhash(img) -> int:
+    """64-bit difference hash: survives re-encoding, resizing and small crops."""
+    small = img.convert("L").resize((9, 8), Image.LANCZOS).tobytes()
+    dhash = 0
+    for row in range(8):
+        for col in range(8):
+            dhash = (dhash << 1) | (small[row * 9 + col] > small[row * 9 + col + 1])
+    return dhash
+
+def preprocess_image(data: bytes) -> tuple:
+    """Returns (image bytes, mime type, dHash or None) ready for Vision/Gemini. CPU-bound: call via asyncio.to_thread."""
+    mime_type = sniff_image_type(data)
+    if mime_type is None:
+        raise UnsupportedImageError("Unsupported image format. Please upload a JPEG, PNG, WebP or HEIC photo.")
+    if Image is None:
+        return data, mime_type, None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.draft("RGB", (IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION)) # JPEG: decode at reduced scale
+            img = ImageOps.exif_transpose(img) # Keep the orientation, since EXIF is dropped below
+            img.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION))
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            out = io.BytesIO()
+            img.save(out, "JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+            dhash = image_dhash(img)
+    except Exception as e:
+        if mime_type == "image/heic":
+            # Without pillow-heif the original goes through; Gemini accepts HEIC as-is.
+            print(f"Could not decode HEIC upload, sending original: {e}")
+            return data, mime_type, None
+        raise UnsupportedImageError("The image could not be read. Please upload a clear photo.") from e
+    return out.getvalue(), "image/jpeg", dhash
+
+def crop_prefilter(image_bytes: bytes) -> Optional[bool]:
+    """Colour check on a thumbnail: True = clearly vegetation, False = clearly not a crop photo, None = ask Vision."""
+    if not CROP_PREFILTER_ENABLED or np is None or Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            img.draft("RGB", (64, 64))
+            pixels = np.asarray(img.convert("RGB").resize((64, 64)), dtype=np.float32)
+    except Exception as e:
+        print(f"Crop pre-filter could not decode image: {e}")
+        return None
+    r, g, b = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+    total = r + g + b + 1e-6
+    # Excess-green index on chromatic coordinates; also true for yellowing leaves, not for soil.
+    exg = (2 * g - r - b) / total
+    green = float(np.mean((exg > 0.1) & (total > 60)))
+    if green >= CROP_PREFILTER_ACCEPT_GREEN:
+        verdict = True
+    elif green > CROP_PREFILTER_REJECT_GREEN:
+        verdict = None
+    else:
+        luma = 0.299 * r + 0.587 * g + 0.114 * b
+        brightest = pixels.max(axis=-1)
+        saturation = (brightest - pixels.min(axis=-1)) / (brightest + 1e-6)
+        if luma.mean() < 25:
+            verdict = False # Covered lens or pitch-dark frame
+        elif np.mean(saturation < 0.1) > 0.9:
+            verdict = False # Documents, screenshots, blank walls
+        else:
+            verdict = None # Soil, skin, produce: Vision decides
+    inc_metric("crop_prefilter_total", verdict={True: "accept", False: "reject", None: "ambiguous"}[verdict])
+    return verdict
+
+# --------------------------------------------------------------------------
+# CROP ANALYSIS JOBS
+# --------------------------------------------------------------------------
+# Uploads are persisted in Mongo and analysed by a pool of background workers,
+# so a dropped mobile connection never loses or repeats finished work.
+
+CROP_JOB_FINAL_STATES = ("done", "failed")
+crop_job_queue: Optional[asyncio.Queue] = None
+crop_job_workers: List[asyncio.Task] = []
+_crop_job_changed: dict = {} # job id -> asyncio.Event, for SSE streams in this process
+_crop_job_listeners: dict = {} # job id -> number of open SSE streams
+
+def crop_job_view(job: dict) -> dict:
+    return {
+        "job_id": str(job["_id"]),
+        "status": job["status"],
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": job["created_at"].isoformat(),
+        "updated_at": job["updated_at"].isoformat(),
+    }
+
+def validate_webhook_url(url: str) -> str:
+    try:
+        parsed = httpx.URL(url)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid webhook URL")
+    if parsed.scheme != "https" or not parsed.host:
+        raise HTTPException(status_code=400, detail="Webhook URL must use https")
+    if parsed.host not in CROP_JOB_WEBHOOK_HOSTS:
+        raise HTTPException(status_code=400, detail="Webhook host is not allowed")
+    return url
+
+async def check_webhook_host(url: str):
+    """Raises ValueError unless every address the host resolves to is public."""
+    parsed = httpx.URL(url)
+    infos = await asyncio.get_running_loop().getaddrinfo(parsed.host, parsed.port or 443)
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"{parsed.host} resolves to non-public address {address}")
+
+def get_crop_job(job_id: str, current_user: dict) -> dict:
+    try:
+        job = crop_jobs_collection.find_one(
+            {"_id": ObjectId(job_id), "user_email": current_user.get("email")}, {"image": 0}
+        )
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid job ID format")
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or access denied")
+    return job
+
+async def submit_crop_job(file: UploadFile, digest: str, language: str, current_user: dict, webhook_url: Optional[str] = None) -> tuple:
+    """Returns (job, created). Re-uploads of the same image (by raw sha256) reuse the existing job."""
+    profile = _response_profile.get() or {"low_bandwidth": False, "audio": True}
+    existing = crop_jobs_collection.find_one(
+        {
+            "user_email": current_user.get("email"), "image_sha256": digest, "language": language,
+            "profile": profile, "status": {"$ne": "failed"},
+        },
+        {"image": 0},
+        sort=[("created_at", pymongo.DESCENDING)],
+    )
+    if existing:
+        inc_metric("crop_jobs_total", status="deduplicated")
+        return existing, False
+
+    # Only the compact re-encoded image is stored; the digest is of the original upload.
+    # run_crop_job unsets it when the job finishes, whether it succeeded or failed.
+    image_bytes = await file.read()
+    with timing_span("preprocess"):
+        image, mime_type, dhash = await asyncio.to_thread(preprocess_image, image_bytes)
+    now = datetime.utcnow()
+    job = {
+        "user_email": current_user.get("email"), "image_sha256": digest, "language": language,
+        "profile": profile, "webhook_url": webhook_url, "image": image, "mime_type": mime_type,
+        "dhash": None if dhash is None else f"{dhash:016x}", # Hex: Mongo ints are signed 64-bit
+        "status": "queued", "attempts": 0, "created_at": now, "updated_at": now,
+    }
+    job["_id"] = crop_jobs_collection.insert_one(job).inserted_id
+    inc_metric("crop_jobs_total", status="queued")
+    if crop_job_queue is not None:
+        crop_job_queue.put_nowait(job["_id"])
+    return job, True
+
+def _notify_crop_job(job_id):
+    event = _crop_job_changed.pop(str(job_id), None)
+    if event is not None:
+        event.set()
+
+async def run_crop_job(job_id):
+    # Claiming is atomic, so a job is never analysed twice even with several processes.
+    job = crop_jobs_collection.find_one_and_update(
+        {"_id": job_id, "status": "queued"},
+        {"$set": {"status": "running", "updated_at": datetime.utcnow()}, "$inc": {"attempts": 1}},
+        return_document=pymongo.ReturnDocument.AFTER,
+    )
+    if job is None:
+        return
+    _notify_crop_job(job_id)
+    _response_profile.set(job["profile"])
+    start_request_deadline("crop_job")
+    language = job["language"]
+    try:
+        dhash = int(job["dhash"], 16) if job.get("dhash") else None
+        result = await diagnose_crop_image(job["image"], language, job.get("mime_type", "image/jpeg"), dhash)
+        fields = {"status": "done", "result": result}
+    except CropAnalysisError as e:
+        fields = {"status": "failed", "error": str(e)}
+    except Exception as e:
+        print(f"Crop job {job_id} error: {e}")
+        fields = {"status": "failed", "error": "Image analysis failed due to a server error."}
+    fields["updated_at"] = datetime.utcnow()
+    job = crop_jobs_collection.find_one_and_update(
+        {"_id": job_id}, {"$set": fields, "$unset": {"image": ""}},
+        projection={"image": 0}, return_document=pymongo.ReturnDocument.AFTER,
+    )
+    inc_metric("crop_jobs_total", status=fields["status"])
+    _notify_crop_job(job_id)
+    if job and job.get("webhook_url"):
+        await notify_crop_job_webhook(job)
+
+async def notify_crop_job_webhook(job: dict):
+    try:
+        # Re-checked at send time: DNS may have changed since the job was submitted.
+        await check_webhook_host(job["webhook_url"])
+        r = await http_client.post(job["webhook_url"], json=crop_job_view(job), timeout=CROP_JOB_WEBHOOK_TIMEOUT)
+        r.raise_for_status()
+    except Exception as e:
+        print(f"Crop job {job['_id']} webhook failed: {e}")
+
+async def crop_job_worker():
+    while True:
+        job_id = await crop_job_queue.get()
+        try:
+            await run_crop_job(job_id)
+        except Exception as e:
+            print(f"Crop job worker error ({job_id}): {e}")
+        finally:
+            crop_job_queue.task_done()
+
+def requeue_pending_crop_jobs() -> int:
+    """Re-queues jobs left behind by a previous process (queued, or running but stale)."""
+    stale = datetime.utcnow() - timedelta(seconds=CROP_JOB_STALE_AFTER)
+    crop_jobs_collection.update_many(
+        {"status": "running", "updated_at": {"$lt": stale}},
+        {"$set": {"status": "queued", "updated_at": datetime.utcnow()}},
+    )
+    pending = crop_jobs_collection.find({"status": "queued"}, {"_id": 1}).sort("created_at", pymongo.ASCENDING)
+    count = 0
+    for job in pending:
+        crop_job_queue.put_nowait(job["_id"])
+        count += 1
+    return count
+
+def start_crop_job_workers():
+    global crop_job_queue
+    crop_job_queue = asyncio.Queue()
+    crop_job_workers.extend(asyncio.create_task(crop_job_worker()) for _ in range(CROP_JOB_WORKERS))
+    requeued = requeue_pending_crop_jobs()
+    if requeued:
+        print(f"Re-queued {requeued} pending crop job(s)")
+
+async def stop_crop_job_workers():
+    for task in crop_job_workers:
+        task.cancel()
+    await asyncio.gather(*crop_job_workers, return_exceptions=True)
+    crop_job_workers.clear()
+
+async def crop_job_events(job: dict, request: Request):
+    """Server-sent events: one "status" event per state change until the job finishes."""
+    job_id = job["_id"]
+    key = str(job_id)
+    last_status = None
+    deadline = time.monotonic() + CROP_JOB_EVENTS_TIMEOUT
+    _crop_job_listeners[key] = _crop_job_listeners.get(key, 0) + 1
+    try:
+        while True:
+            # Register for change notifications before re-reading, so no update is missed.
+            event = _crop_job_changed.setdefault(key, asyncio.Event())
+            job = crop_jobs_collection.find_one({"_id": job_id}, {"image": 0}) or job
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: status\ndata: {json.dumps(crop_job_view(job))}\n\n"
+            if job["status"] in CROP_JOB_FINAL_STATES or time.monotonic() >= deadline:
+                return
+            if await request.is_disconnected():
+                return
+            try:
+                await asyncio.wait_for(event.wait(), CROP_JOB_EVENTS_POLL)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+    finally:
+        _crop_job_listeners[key] -= 1
+        if not _crop_job_listeners[key]:
+            del _crop_job_listeners[key]
+            _crop_job_changed.pop(key, None)
+
 # --------------------------------------------------------------------------
 # FASTAPI ENDPOINTS
 # --------------------------------------------------------------------------
@@ -3806,35 +5962,44 @@ async def read_login_page_endpoint(request: Request):
             return Response(status_code=307, headers={"Location": "/dashboard"})
         except JWTError:
             pass
-    return HTMLResponse(content=LOGIN_HTML_CONTENT) 
+    return shell_response(LOGIN_PAGE_VARIANTS, LOGIN_PAGE_ETAG, request)
 
 @app.get("/dashboard", response_class=HTMLResponse)
-async def read_dashboard_endpoint(current_user: dict = Depends(get_current_user_dependency)):
-    user_name = current_user.get("name", "Farmer")
-    user_email = current_user.get("email", "")
-    user_phone = current_user.get("phone", "")
-    user_location = current_user.get("location", "Not Set")
-    user_crop = current_user.get("preferred_crop", "Paddy")
-    user_initial = user_name[0].upper() if user_name else "U"
-    
-    content = HTML_CONTENT.replace("{{USER_NAME}}", user_name)
-    content = content.replace("{{USER_EMAIL}}", user_email)
-    content = content.replace("{{USER_INITIAL}}", user_initial)
-    content = content.replace("{{USER_PHONE}}", user_phone)
-    content = content.replace("{{USER_LOCATION}}", user_location)
-    content = content.replace("{{USER_CROP}}", user_crop)
-    
-    return HTMLResponse(content=content)
+async def read_dashboard_endpoint(request: Request, current_user: dict = Depends(get_current_user_dependency)):
+    return shell_response(DASHBOARD_SHELL_VARIANTS, DASHBOARD_SHELL_ETAG, request)
+
+@app.get("/me")
+async def read_current_user_endpoint(current_user: dict = Depends(get_current_user_dependency)):
+    return FastJSONResponse(content=get_user_profile(current_user), headers={"Cache-Control": "private, no-store"})
+
+@app.get("/bootstrap")
+async def bootstrap_endpoint(language: str = Query("en-US"), current_user: dict = Depends(response_profile_dependency)):
+    # Everything the dashboard needs on load, behind a single auth check.
+    # The advisory is only included when cached; the page falls back to /advisory.
+    advisory = advisory_cache.get(advisory_cache_key(current_user, language))
+    chats = await asyncio.to_thread(list_chat_sessions, current_user.get("email"), BOOTSTRAP_CHAT_PAGE_SIZE)
+    return FastJSONResponse(
+        content={
+            "profile": get_user_profile(current_user),
+            "chats": chats,
+            "advisory": advisory,
+            "suggested_questions": get_starter_questions(language),
+        },
+        headers={"Cache-Control": "private, no-store"},
+    )
+
+@app.get("/assets/{filename}")
+async def static_asset_endpoint(filename: str, request: Request):
+    variants = STATIC_ASSETS.get(filename)
+    if variants is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    media_type = ASSET_MEDIA_TYPES[filename.rsplit(".", 1)[-1]]
+    return precompressed_response(variants, request, media_type=media_type, headers={"Cache-Control": ASSET_CACHE_CONTROL})
 
 @app.get("/chats", response_model=List[ChatSessionInfo])
 async def get_chat_list_endpoint(current_user: dict = Depends(get_current_user_dependency)):
-    user_email = current_user.get("email")
-    chat_sessions = chats_collection.find(
-        {"user_email": user_email},
-        {"_id": 1, "title": 1, "created_at": 1}
-    ).sort("created_at", pymongo.DESCENDING)
-    
-    return [ChatSessionInfo(id=str(chat["_id"]), title=chat["title"]) for chat in chat_sessions]
+    # Read-only: the stored data is already in shape, so skip response-model validation.
+    return FastJSONResponse(content=list_chat_sessions(current_user.get("email")))
 
 @app.get("/chats/{chat_id}", response_model=ChatSessionDetail)
 async def get_chat_details_endpoint(chat_id: str, current_user: dict = Depends(get_current_user_dependency)):
@@ -3848,10 +6013,11 @@ async def get_chat_details_endpoint(chat_id: str, current_user: dict = Depends(g
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found or access denied")
         
-    return ChatSessionDetail(
-        id=str(chat["_id"]), title=chat["title"],
-        messages=[Message(**msg) for msg in chat["messages"]]
-    )
+    # Read-only: build the JSON directly instead of a Message model per stored message.
+    return FastJSONResponse(content={
+        "id": str(chat["_id"]), "title": chat["title"],
+        "messages": [{"role": msg["role"], "text": msg["text"]} for msg in chat["messages"]]
+    })
 
 @app.post("/save_chat")
 async def save_chat_endpoint(request: ChatSaveRequest, current_user: dict = Depends(get_current_user_dependency)):
@@ -3890,70 +6056,160 @@ async def save_chat_endpoint(request: ChatSaveRequest, current_user: dict = Depe
     return {"chat_id": str(chat_id), "title": title}
 
 @app.get("/advisory", response_model=AdvisoryResponse)
-async def advisory_handler_endpoint(language: str = Query("en-US"), current_user: dict = Depends(get_current_user_dependency)):
+async def advisory_handler_endpoint(language: str = Query("en-US"), current_user: dict = Depends(response_profile_dependency)):
+    start_request_deadline("advisory")
     return await handle_advisory(language, current_user)
 
 @app.post("/chat")
-async def chat_handler_endpoint(request: ChatRequest, current_user: dict = Depends(get_current_user_dependency)):
+async def chat_handler_endpoint(request: ChatRequest, current_user: dict = Depends(response_profile_dependency)):
+    start_request_deadline("chat")
     try:
-        text = get_gemini_response(request.text, request.language)
+        text = await get_gemini_response(request.text, request.language)
         clean_speech_text = clean_text_for_speech(text)
-        audio = text_to_speech_google(clean_speech_text, request.language)
+        audio = await text_to_speech_google(clean_speech_text, request.language)
         
-        return {"text": text, "audio": audio}
+        return timed_json_response({"text": text, "audio": audio})
     except Exception as e:
         print(f"Chat error: {e}")
         err = "Sorry, something went wrong with the AI service."
         try:
-            audio = text_to_speech_google(clean_text_for_speech(err), request.language)
+            audio = await text_to_speech_google(clean_text_for_speech(err), request.language)
         except:
              audio = None
-        return {"text": err, "audio": audio}
+        return timed_json_response({"text": err, "audio": audio})
 
 @app.post("/suggest_questions")
 async def suggested_questions_handler_endpoint(request: SuggestedQuestionsRequest, current_user: dict = Depends(get_current_user_dependency)):
+    start_request_deadline("suggest_questions")
     try:
-        questions = get_suggested_questions(request.history, request.language)
+        questions = await get_suggested_questions(request.history, request.language)
         return {"questions": questions}
     except Exception as e:
         print(f"API Suggested questions error: {e}")
         return {"questions": ["What is the current market price?", "How to prevent pest attacks?", "Where can I find government subsidies?"]}
 
 @app.post("/analyse-crop")
-async def analyse_crop_handler_endpoint(file: UploadFile = File(...), language: str = Form("en-US"), current_user: dict = Depends(get_current_user_dependency)):
+async def analyse_crop_handler_endpoint(file: UploadFile = File(...), language: str = Form("en-US"), current_user: dict = Depends(response_profile_dependency)):
+    start_request_deadline("analyse_crop")
     try:
-        content = await file.read()
-        text = analyze_crop_image(content, language)
-        clean_speech_text = clean_text_for_speech(text)
-        audio = text_to_speech_google(clean_speech_text, language) 
-        
-        return {"text": text, "audio": audio}
+        with timing_span("upload"):
+            digest = await inspect_upload(file)
+        result = cached_crop_diagnosis(digest, language)
+        if result is None:
+            content = await file.read()
+            with timing_span("preprocess"):
+                image, mime_type, dhash = await asyncio.to_thread(preprocess_image, content)
+            if dhash is not None:
+                upload_hash_cache.put(digest, dhash)
+            result = await diagnose_crop_image(image, language, mime_type, dhash)
+        return timed_json_response(result)
+    except UploadTooLargeError as e:
+        raise HTTPException(413, detail={"text": str(e), "audio": None})
+    except UnsupportedImageError as e:
+        raise HTTPException(415, detail={"text": str(e), "audio": None})
+    except CropAnalysisError as e:
+        raise HTTPException(502, detail={"text": str(e), "audio": None})
     except Exception as e:
         print(f"Crop error: {e}")
         err = "Image analysis failed due to a server error."
         try:
-            audio = text_to_speech_google(clean_text_for_speech(err), language)
+            audio = await text_to_speech_google(clean_text_for_speech(err), language)
         except:
              audio = None
         raise HTTPException(500, detail={"text": err, "audio": audio})
 
+@app.post("/analyse-crop/batch")
+async def analyse_crop_batch_endpoint(files: List[UploadFile] = File(...), language: str = Form("en-US"), current_user: dict = Depends(response_profile_dependency)):
+    start_request_deadline("analyse_crop_batch")
+    if len(files) > CROP_BATCH_MAX_IMAGES:
+        raise HTTPException(413, detail={"text": f"Please upload at most {CROP_BATCH_MAX_IMAGES} images at a time.", "audio": None})
+    try:
+        with timing_span("upload"):
+            contents = []
+            for file in files:
+                await inspect_upload(file)
+                contents.append(await file.read())
+        with timing_span("preprocess"):
+            processed = await asyncio.gather(*(asyncio.to_thread(preprocess_image, content) for content in contents))
+        result = await analyze_crop_batch([(image, mime_type) for image, mime_type, _ in processed], language)
+        for item in result["images"]:
+            item["filename"] = files[item["index"]].filename
+        audio = await text_to_speech_google(clean_text_for_speech(result["summary"]), language)
+        return timed_json_response({**result, "audio": audio})
+    except UploadTooLargeError as e:
+        raise HTTPException(413, detail={"text": str(e), "audio": None})
+    except UnsupportedImageError as e:
+        raise HTTPException(415, detail={"text": str(e), "audio": None})
+    except CropAnalysisError as e:
+        raise HTTPException(502, detail={"text": str(e), "audio": None})
+    except Exception as e:
+        print(f"Batch crop error: {e}")
+        raise HTTPException(500, detail={"text": "Image analysis failed due to a server error.", "audio": None})
+
+@app.post("/analyse-crop/jobs")
+async def create_crop_job_endpoint(
+    file: UploadFile = File(...),
+    language: str = Form("en-US"),
+    webhook_url: Optional[str] = Form(None),
+    current_user: dict = Depends(response_profile_dependency)
+):
+    if webhook_url:
+        validate_webhook_url(webhook_url)
+        try:
+            await check_webhook_host(webhook_url)
+        except (OSError, ValueError):
+            raise HTTPException(status_code=400, detail="Webhook host is not allowed")
+    try:
+        with timing_span("upload"):
+            digest = await inspect_upload(file)
+        job, created = await submit_crop_job(file, digest, language, current_user, webhook_url)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedImageError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    return FastJSONResponse(status_code=202 if created else 200, content=crop_job_view(job))
+
+@app.get("/analyse-crop/jobs/{job_id}")
+async def get_crop_job_endpoint(job_id: str, current_user: dict = Depends(get_current_user_dependency)):
+    return FastJSONResponse(content=crop_job_view(get_crop_job(job_id, current_user)))
+
+@app.get("/analyse-crop/jobs/{job_id}/events")
+async def crop_job_events_endpoint(job_id: str, request: Request, current_user: dict = Depends(get_current_user_dependency)):
+    job = get_crop_job(job_id, current_user)
+    return StreamingResponse(
+        crop_job_events(job, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/weather/{city}")
-async def weather_handler_endpoint(city: str, language: str = Query("en-US"), current_user: dict = Depends(get_current_user_dependency)):
+async def weather_handler_endpoint(city: str, language: str = Query("en-US"), current_user: dict = Depends(response_profile_dependency)):
+    start_request_deadline("weather")
     try:
-        text = get_weather(city, language)
+        text = await get_weather(city, language)
         clean_speech_text = clean_text_for_speech(text)
-        audio = text_to_speech_google(clean_speech_text, language)
+        audio = await text_to_speech_google(clean_speech_text, language)
         return {"text": text, "audio": audio}
     except Exception as e:
         print(f"Weather error: {e}")
         err = "Could not fetch weather."
-        audio = text_to_speech_google(clean_text_for_speech(err), language)
+        audio = await text_to_speech_google(clean_text_for_speech(err), language)
         return {"text": err, "audio": audio}
 
+@app.get("/places/suggest")
+async def places_suggest_endpoint(q: str = Query("", max_length=100), limit: int = Query(PLACE_SUGGEST_LIMIT, ge=1, le=PLACE_SUGGEST_MAX_LIMIT)):
+    # Public and unauthenticated: it only exposes the bundled gazetteer, and
+    # skipping the session lookup keeps per-keystroke requests cheap.
+    return FastJSONResponse(
+        content={"query": q, "suggestions": gazetteer.suggest(q, limit)},
+        headers={"Cache-Control": PLACE_SUGGEST_CACHE_CONTROL},
+    )
+
 @app.post("/price")
-async def price_handler_endpoint(request: ChatRequest, current_user: dict = Depends(get_current_user_dependency)):
+async def price_handler_endpoint(request: ChatRequest, current_user: dict = Depends(response_profile_dependency)):
+    start_request_deadline("price")
     try:
-        text = get_price_prediction(request.text, request.language)
+        text = await get_price_prediction(request.text, request.language)
         return {"text": text, "audio": None}
     except Exception as e:
         print(f"Price error: {e}")
@@ -3961,15 +6217,30 @@ async def price_handler_endpoint(request: ChatRequest, current_user: dict = Depe
         return {"text": err, "audio": None}
 
 @app.post("/scheme")
-async def scheme_handler_endpoint(request: ChatRequest, current_user: dict = Depends(get_current_user_dependency)):
+async def scheme_handler_endpoint(request: ChatRequest, current_user: dict = Depends(response_profile_dependency)):
+    start_request_deadline("scheme")
     try:
-        text = get_scheme_advice(request.text, request.language)
+        text = await get_scheme_advice(request.text, request.language)
         return {"text": text, "audio": None}
     except Exception as e:
         print(f"Scheme error: {e}")
         err = "Scheme info failed."
         return {"text": err, "audio": None}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/profile", response_class=PlainTextResponse)
+async def admin_profile_endpoint(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(PROFILE_DEFAULT_INTERVAL_MS, ge=1, le=1000),
+    admin_user: dict = Depends(get_admin_user_dependency)
+):
+    collapsed = await profile_worker(seconds, interval_ms / 1000)
+    filename = f"grama-vaani-{os.getpid()}-{datetime.utcnow():%Y%m%dT%H%M%S}.collapsed"
+    return PlainTextResponse(collapsed, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
 @app.get("/auth/google")
 async def auth_google_endpoint():
     raise HTTPException(501, "Google Auth not implemented. Requires OAuth2 setup.")
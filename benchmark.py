@@ -0,0 +1,456 @@
+# --------------------------------------------------------------------------
+# Grama Vaani - Offline Benchmark
+# --------------------------------------------------------------------------
+# Drives the FastAPI app in-process against local stand-ins for Gemini,
+# Cloud Vision, Cloud TTS, MongoDB and the three HTTP APIs (geocode.maps.co,
+# Open-Meteo, data.gov.in). No Google credentials, Mongo or network needed.
+#
+# Run: python benchmark.py --requests 500 --concurrency 20
+#      python benchmark.py --latency-scale 0.1 --error-rate 0.02
+#      python benchmark.py --replay upstream_cassette.jsonl --replay-scale 1.0
+#
+# --replay serves Gemini/Vision/TTS/HTTP results from a cassette recorded with
+# CASSETTE_MODE=record (see app.py) instead of the synthetic fakes.
+# --------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import itertools
+import threading
+from types import SimpleNamespace
+
+# The app reads these at import time.
+os.environ.setdefault("HTTP_PREWARM", "false")
+
+import httpx
+import pymongo
+import vertexai
+import vertexai.generative_models
+from google.cloud import texttospeech, vision
+
+# --------------------------------------------------------------------------
+# LATENCY / ERROR PROFILES
+# --------------------------------------------------------------------------
+# dependency -> (median seconds, log-normal sigma, error rate)
+DEFAULT_PROFILES = {
+    "gemini": (0.9, 0.6, 0.01),
+    "vision": (0.35, 0.4, 0.005),
+    "tts": (0.25, 0.5, 0.005),
+    "mongo": (0.002, 0.5, 0.0),
+    "geocode": (0.4, 0.6, 0.02),
+    "open-meteo": (0.15, 0.4, 0.005),
+    "data.gov.in": (0.6, 0.7, 0.03),
+}
+
+# endpoint name -> relative weight in the request mix
+DEFAULT_MIX = {
+    "chat": 40,
+    "advisory": 15,
+    "weather": 15,
+    "analyse-crop": 10,
+    "analyse-crop-batch": 5,
+    "save_chat": 15,
+}
+
+PROFILES = dict(DEFAULT_PROFILES)
+LATENCY_SCALE = 1.0
+
+class UpstreamError(Exception):
+    pass
+
+def sample_latency(dependency: str) -> float:
+    median, sigma, _ = PROFILES[dependency]
+    return random.lognormvariate(0, sigma) * median * LATENCY_SCALE
+
+def simulate_call(dependency: str):
+    """Blocking stand-in for an SDK call: sleeps a sampled latency, sometimes fails."""
+    time.sleep(sample_latency(dependency))
+    if random.random() < PROFILES[dependency][2]:
+        raise UpstreamError(f"simulated {dependency} failure")
+
+async def simulate_call_async(dependency: str):
+    await asyncio.sleep(sample_latency(dependency))
+    if random.random() < PROFILES[dependency][2]:
+        raise UpstreamError(f"simulated {dependency} failure")
+
+# --------------------------------------------------------------------------
+# FAKE GOOGLE CLIENTS
+# --------------------------------------------------------------------------
+
+FAKE_ANSWER = (
+    "Namaste! Here is today's advice:\n\n"
+    "* **Irrigation:** Water early in the morning to reduce evaporation.\n"
+    "* **Pests:** Check the underside of leaves for aphids.\n\n"
+    "| Day | Action |\n|:---:|:---:|\n| Today | Irrigate |\n| Tomorrow | Scout pests |\n"
+)
+
+class FakeGeminiChat:
+    def send_message(self, prompt, **kwargs):
+        simulate_call("gemini")
+        return SimpleNamespace(text=FAKE_ANSWER)
+
+class FakeGenerativeModel:
+    def __init__(self, model_name, *args, **kwargs):
+        self.model_name = model_name
+
+    def start_chat(self, **kwargs):
+        return FakeGeminiChat()
+
+    def generate_content(self, contents, **kwargs):
+        simulate_call("gemini")
+        return SimpleNamespace(text=FAKE_ANSWER)
+
+class FakeImageAnnotatorClient:
+    LABELS = ["Leaf", "Plant", "Crop", "Green", "Agriculture"]
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def label_detection(self, image=None, **kwargs):
+        simulate_call("vision")
+        return SimpleNamespace(label_annotations=[SimpleNamespace(description=l, score=0.9) for l in self.LABELS])
+
+    def batch_annotate_images(self, requests=None, **kwargs):
+        simulate_call("vision")
+        annotations = [SimpleNamespace(description=l, score=0.9) for l in self.LABELS]
+        return SimpleNamespace(responses=[SimpleNamespace(label_annotations=annotations) for _ in requests])
+
+class FakeTextToSpeechClient:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def synthesize_speech(self, input=None, voice=None, audio_config=None, **kwargs):
+        simulate_call("tts")
+        # Roughly 1 KB of MP3 per 10 characters of speech.
+        return SimpleNamespace(audio_content=os.urandom(max(1024, len(input.text) * 100)))
+
+# --------------------------------------------------------------------------
+# FAKE MONGODB (only the operations app.py uses)
+# --------------------------------------------------------------------------
+
+def _matches(doc: dict, query: dict) -> bool:
+    for key, expected in query.items():
+        value = doc.get(key)
+        if isinstance(expected, dict) and any(k.startswith("$") for k in expected):
+            for op, arg in expected.items():
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$ne" and value == arg:
+                    return False
+                if op == "$gte" and (value is None or value < arg):
+                    return False
+                if op == "$lt" and (value is None or value >= arg):
+                    return False
+        elif value != expected:
+            return False
+    return True
+
+def _project(doc: dict, projection) -> dict:
+    if not projection:
+        return dict(doc)
+    keep = {k for k, v in projection.items() if v}
+    if not keep:
+        drop = set(projection)
+        return {k: v for k, v in doc.items() if k not in drop}
+    return {k: v for k, v in doc.items() if k in keep or k == "_id"}
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction=pymongo.ASCENDING):
+        self.docs.sort(key=lambda d: d.get(key) or 0, reverse=direction == pymongo.DESCENDING)
+        return self
+
+    def limit(self, n):
+        if n:
+            self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = []
+        self.lock = threading.Lock()
+
+    def create_index(self, *args, **kwargs):
+        return "index"
+
+    def find_one(self, query=None, projection=None, **kwargs):
+        simulate_call("mongo")
+        with self.lock:
+            for doc in self.docs:
+                if _matches(doc, query or {}):
+                    return _project(doc, projection)
+        return None
+
+    def find(self, query=None, projection=None, **kwargs):
+        simulate_call("mongo")
+        with self.lock:
+            return FakeCursor([_project(d, projection) for d in self.docs if _matches(d, query or {})])
+
+    def insert_one(self, doc):
+        simulate_call("mongo")
+        from bson.objectid import ObjectId
+        doc = dict(doc)
+        doc.setdefault("_id", ObjectId())
+        with self.lock:
+            self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    def update_one(self, query, update, upsert=False):
+        simulate_call("mongo")
+        with self.lock:
+            for doc in self.docs:
+                if _matches(doc, query):
+                    _apply_update(doc, update)
+                    return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+            if upsert:
+                from bson.objectid import ObjectId
+                doc = {k: v for k, v in query.items() if not isinstance(v, dict)}
+                doc.update(update.get("$setOnInsert", {}))
+                doc.update(update.get("$set", {}))
+                doc.setdefault("_id", ObjectId())
+                self.docs.append(doc)
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    def update_many(self, query, update):
+        simulate_call("mongo")
+        with self.lock:
+            matched = [doc for doc in self.docs if _matches(doc, query)]
+            for doc in matched:
+                _apply_update(doc, update)
+        return SimpleNamespace(matched_count=len(matched), modified_count=len(matched))
+
+    def find_one_and_update(self, query, update, projection=None, return_document=False, **kwargs):
+        simulate_call("mongo")
+        with self.lock:
+            for doc in self.docs:
+                if _matches(doc, query):
+                    before = _project(doc, projection)
+                    _apply_update(doc, update)
+                    return _project(doc, projection) if return_document else before
+        return None
+
+def _apply_update(doc, update):
+    doc.update(update.get("$set", {}))
+    for key, amount in update.get("$inc", {}).items():
+        doc[key] = doc.get(key, 0) + amount
+    for key in update.get("$unset", {}):
+        doc.pop(key, None)
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+class FakeMongoClient:
+    def __init__(self, *args, **kwargs):
+        self.databases = {}
+
+    def __getitem__(self, name):
+        return self.databases.setdefault(name, FakeDatabase())
+
+# --------------------------------------------------------------------------
+# FAKE HTTP APIS
+# --------------------------------------------------------------------------
+
+async def fake_http_handler(request: httpx.Request) -> httpx.Response:
+    host = request.url.host
+    if host == "geocode.maps.co":
+        await simulate_call_async("geocode")
+        return httpx.Response(200, json=[{"lat": "11.0168", "lon": "76.9558", "display_name": "Coimbatore, Tamil Nadu, India"}])
+    if host == "api.open-meteo.com":
+        await simulate_call_async("open-meteo")
+        days = int(request.url.params.get("forecast_days", "7"))
+        return httpx.Response(200, json={
+            "current_weather": {"temperature": 29.4, "windspeed": 8.2, "weathercode": 2},
+            "daily": {
+                "time": [f"2026-10-{19 + i:02d}" for i in range(days)],
+                "weathercode": [2] * days,
+                "temperature_2m_max": [31.0] * days,
+                "temperature_2m_min": [22.5] * days,
+                "precipitation_sum": [1.2] * days,
+            },
+        })
+    if host == "api.data.gov.in":
+        await simulate_call_async("data.gov.in")
+        return httpx.Response(200, json={"records": [
+            {"scheme_name": "PM-KISAN", "brief_description": "Income support for farmers.", "more_details_url_link": "https://pmkisan.gov.in"},
+        ]})
+    return httpx.Response(404)
+
+# --------------------------------------------------------------------------
+# LOAD THE APP WITH THE FAKES
+# --------------------------------------------------------------------------
+
+def load_app():
+    pymongo.MongoClient = FakeMongoClient
+    texttospeech.TextToSpeechClient = FakeTextToSpeechClient
+    vision.ImageAnnotatorClient = FakeImageAnnotatorClient
+    vertexai.init = lambda **kwargs: None
+    vertexai.generative_models.GenerativeModel = FakeGenerativeModel
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as grama_vaani
+    return grama_vaani
+
+# --------------------------------------------------------------------------
+# LOAD GENERATOR
+# --------------------------------------------------------------------------
+
+QUESTIONS = [
+    "How do I control aphids on my tomato plants?",
+    "When should I irrigate paddy during flowering?",
+    "What fertilizer is best for sugarcane?",
+    "How to prevent fungal disease in chilli?",
+]
+CITIES = ["Coimbatore", "Madurai", "Nagpur", "Guntur", "Mandya"]
+
+def make_fake_image() -> bytes:
+    """A phone-sized JPEG when Pillow is available (the app decodes uploads then), else JPEG-tagged noise."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return b"\xff\xd8\xff\xe0" + os.urandom(200 * 1024) + b"\xff\xd9"
+    size = (3000, 4000)
+    bands = [Image.effect_noise(size, sigma).point(lambda v, base=base: base + v // 4) for sigma, base in ((40, 20), (60, 110), (40, 30))]
+    out = io.BytesIO()
+    Image.merge("RGB", bands).save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+FAKE_IMAGE = make_fake_image()
+
+async def run_endpoint(client: httpx.AsyncClient, endpoint: str, chat_ids: list) -> int:
+    if endpoint == "chat":
+        r = await client.post("/chat", json={"text": random.choice(QUESTIONS), "language": "en-US"})
+    elif endpoint == "advisory":
+        r = await client.get("/advisory", params={"language": "en-US"})
+    elif endpoint == "weather":
+        r = await client.get(f"/weather/{random.choice(CITIES)}", params={"language": "en-US"})
+    elif endpoint == "analyse-crop":
+        r = await client.post("/analyse-crop", files={"file": ("leaf.jpg", FAKE_IMAGE, "image/jpeg")}, data={"language": "en-US"})
+    elif endpoint == "analyse-crop-batch":
+        files = [("files", (f"leaf{i}.jpg", FAKE_IMAGE, "image/jpeg")) for i in range(4)]
+        r = await client.post("/analyse-crop/batch", files=files, data={"language": "en-US"})
+    elif endpoint == "save_chat":
+        messages = [{"role": "user", "text": random.choice(QUESTIONS)}, {"role": "ai", "text": FAKE_ANSWER}]
+        payload = {"chat_id": random.choice(chat_ids) if chat_ids and random.random() < 0.5 else None, "messages": messages}
+        r = await client.post("/save_chat", json=payload)
+        if r.status_code == 200 and payload["chat_id"] is None:
+            chat_ids.append(r.json()["chat_id"])
+    else:
+        raise ValueError(f"Unknown endpoint: {endpoint}")
+    return r.status_code
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+async def run_benchmark(grama_vaani, total_requests: int, concurrency: int, mix: dict, seed: int):
+    random.seed(seed)
+    await grama_vaani.startup_event()
+    await grama_vaani.http_client.aclose()
+    grama_vaani.http_client = httpx.AsyncClient(transport=httpx.MockTransport(fake_http_handler))
+
+    transport = httpx.ASGITransport(app=grama_vaani.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        r = await client.post("/signup", json={
+            "email": "bench@gramavaani.in", "name": "Bench Farmer", "phone": "9999999999",
+            "password": "benchmark-pass", "location": "Coimbatore", "preferred_crop": "Tomato",
+        })
+        r.raise_for_status()
+
+        endpoints = list(mix)
+        weights = [mix[e] for e in endpoints]
+        plan = random.choices(endpoints, weights=weights, k=total_requests)
+        latencies = {e: [] for e in endpoints}
+        errors = {e: 0 for e in endpoints}
+        chat_ids = []
+        counter = itertools.count()
+
+        async def worker():
+            while True:
+                i = next(counter)
+                if i >= len(plan):
+                    return
+                endpoint = plan[i]
+                start = time.perf_counter()
+                try:
+                    status = await run_endpoint(client, endpoint, chat_ids)
+                except Exception:
+                    status = 599
+                latencies[endpoint].append(time.perf_counter() - start)
+                if status >= 400:
+                    errors[endpoint] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    await grama_vaani.shutdown_event()
+    return latencies, errors, elapsed
+
+def print_report(latencies: dict, errors: dict, elapsed: float, concurrency: int):
+    total = sum(len(v) for v in latencies.values())
+    print(f"\n{total} requests in {elapsed:.2f}s at concurrency {concurrency} -> {total / elapsed:.1f} req/s "
+          f"(latency scale {LATENCY_SCALE:g})\n")
+    print(f"{'endpoint':<20}{'count':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, values in latencies.items():
+        values = sorted(values)
+        print(f"{endpoint:<20}{len(values):>7}{errors[endpoint]:>8}{len(values) / elapsed:>9.1f}"
+              f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}{percentile(values, 99) * 1000:>10.1f}")
+
+def parse_mix(text: str) -> dict:
+    """Parses 'chat=40,advisory=15,...' into a weight dict."""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+def main():
+    global LATENCY_SCALE
+    parser = argparse.ArgumentParser(description="Benchmark Grama Vaani against in-process fakes.")
+    parser.add_argument("--requests", type=int, default=300, help="Total requests to send")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. chat=40,advisory=15,weather=15,analyse-crop=10,analyse-crop-batch=5,save_chat=15")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiply every fake latency (0 = no latency)")
+    parser.add_argument("--error-rate", type=float, default=None, help="Override the error rate of every fake dependency")
+    parser.add_argument("--profile", action="append", default=[], metavar="DEP=MEDIAN:SIGMA:ERRORS",
+                        help="Override one dependency, e.g. gemini=1.5:0.8:0.02")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Replay recorded upstream results from this cassette file")
+    parser.add_argument("--replay-scale", type=float, default=1.0, help="Multiply recorded latencies when replaying")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    if args.replay:
+        os.environ["CASSETTE_MODE"] = "replay"
+        os.environ["CASSETTE_PATH"] = args.replay
+        os.environ["CASSETTE_LATENCY_SCALE"] = str(args.replay_scale)
+
+    LATENCY_SCALE = args.latency_scale
+    for dependency, (median, sigma, error_rate) in DEFAULT_PROFILES.items():
+        PROFILES[dependency] = (median, sigma, error_rate if args.error_rate is None else args.error_rate)
+    for override in args.profile:
+        dependency, _, spec = override.partition("=")
+        median, sigma, error_rate = (float(x) for x in spec.split(":"))
+        PROFILES[dependency] = (median, sigma, error_rate)
+
+    grama_vaani = load_app()
+    latencies, errors, elapsed = asyncio.run(run_benchmark(grama_vaani, args.requests, args.concurrency, args.mix, args.seed))
+    print_report(latencies, errors, elapsed, args.concurrency)
+
+if __name__ == "__main__":
+    main()